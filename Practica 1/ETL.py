@@ -2,8 +2,20 @@ import pandas as pd
 import pyodbc
 import logging
 from datetime import datetime
+import json
 import os
 import sys
+import time
+
+from conexion import get_pool, con_reintentos, es_error_transitorio
+from sketches import SketchesKPI, SKETCHES_PATH
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+    pa_csv = None
 
 # Configurar logging
 logging.basicConfig(
@@ -20,33 +32,136 @@ logger = logging.getLogger(__name__)
 DATASET1_PATH = 'Dataset 1.csv'
 DATASET2_PATH = 'Dataset 2.csv'
 
-DATABASE_CONFIG = {
-    'Server': 'localhost,1433',
-    'Database': 'Semi2_P1',
-    'UID': 'sa',
-    'PWD': 'PasswordSegura123!',
-    'Driver': '{ODBC Driver 18 for SQL Server}'
+# Motor de lectura CSV: 'pyarrow' (multihilo) o 'c' (parser por defecto de pandas)
+CSV_ENGINE = 'pyarrow'
+CSV_SEPARATOR = ';'
+# Archivos sin comprimir a partir de este tamaño se leen con memory-map
+CSV_MMAP_MIN_BYTES = 64 * 1024 * 1024
+# Extensiones de archivos comprimidos que se buscan junto a cada dataset
+CSV_COMPRESSED_EXTENSIONS = ('.gz', '.zst', '.bz2')
+# Valores que ambos motores leen como nulos (los valores por defecto de pandas)
+CSV_NULL_VALUES = [
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND',
+    '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+]
+# Tipos explícitos para el lector Arrow (evita la inferencia de tipos); si un archivo
+# no los respeta, ese archivo se lee con el motor 'c' y la transformación lo limpia
+CSV_COLUMN_TYPES = {
+    'passenger_id': 'string',
+    'passenger_gender': 'string',
+    'passenger_age': 'int64',
+    'passenger_nationality': 'string',
+    'booking_datetime': 'string',
+    'sales_channel': 'string',
+    'payment_method': 'string',
+    'ticket_price': 'string',
+    'currency': 'string',
+    'ticket_price_usd_est': 'string',
+    'bags_total': 'int64',
+    'bags_checked': 'int64'
 }
 
+# Directorio del snapshot Parquet del modelo estrella, exportado del warehouse
+# después de cada carga verificada (None para no generarlo)
+SNAPSHOT_DIR = 'snapshot'
+
+# Autotuner de lotes del Loader
+BATCH_INITIAL_SIZE = 1000
+BATCH_MIN_SIZE = 100
+# Tope de memoria de parámetros por lote (define el tamaño máximo según el ancho de fila)
+BATCH_MAX_BYTES = 32 * 1024 * 1024
+# Mejora mínima de filas/seg para seguir duplicando el lote durante el sondeo
+BATCH_IMPROVEMENT = 0.05
+# Caída de filas/seg (sobre la media móvil) que dispara un nuevo sondeo
+BATCH_DEGRADATION = 0.30
+BATCH_DEGRADATION_PATIENCE = 3
+BATCH_EWMA_ALPHA = 0.3
+# Métricas de la ejecución (incluye los tamaños de lote elegidos por tabla)
+ETL_METRICS_PATH = 'etl_metrics.json'
+# Tabla temporal de sesión donde se cargan las ventas antes de moverlas a Hecho_Venta
+STAGING_TABLE = '#Hecho_Venta_staging'
+
 
 # ==================== FASE 1: EXTRACCIÓN ====================
 class ExtractorCSV:
     @staticmethod
-    def extract_data():
+    def resolve_path(dataset_path):
+        """Busca el dataset en texto plano o en alguna variante comprimida."""
+        candidates = [dataset_path] + [dataset_path + ext for ext in CSV_COMPRESSED_EXTENSIONS]
+        for candidate in candidates:
+            if os.path.exists(candidate):
+                return candidate
+        return None
+    
+    @staticmethod
+    def read_csv_pyarrow(dataset_path):
+        """Lee un CSV con el lector multihilo de Arrow y tipos explícitos."""
+        read_options = pa_csv.ReadOptions(use_threads=True)
+        parse_options = pa_csv.ParseOptions(delimiter=CSV_SEPARATOR)
+        # Los campos vacíos se leen como nulos, igual que en pandas, para que la
+        # transformación los rellene (UNKNOWN, OTHER, ...)
+        convert_options = pa_csv.ConvertOptions(
+            column_types={col: pa.type_for_alias(t) for col, t in CSV_COLUMN_TYPES.items()},
+            null_values=CSV_NULL_VALUES,
+            strings_can_be_null=True
+        )
+        
+        # Los comprimidos se descomprimen en streaming según su extensión;
+        # los archivos planos grandes se mapean en memoria en lugar de copiarse.
+        # Arrow omite el BOM UTF-8 del encabezado sin copiar el buffer.
+        if dataset_path.endswith(CSV_COMPRESSED_EXTENSIONS):
+            source = pa.input_stream(dataset_path)
+        elif os.path.getsize(dataset_path) >= CSV_MMAP_MIN_BYTES:
+            source = pa.memory_map(dataset_path, 'r')
+        else:
+            source = pa.OSFile(dataset_path, 'rb')
+        
+        try:
+            with source:
+                table = pa_csv.read_csv(source, read_options=read_options,
+                                        parse_options=parse_options,
+                                        convert_options=convert_options)
+        except pa.ArrowInvalid as e:
+            # Valores que no respetan los tipos explícitos (p. ej. una edad '4x'): se lee
+            # con pandas y la transformación los limpia, en lugar de perder el archivo
+            logger.warning(f"{dataset_path}: {e}; se lee con el motor 'c' de pandas")
+            return ExtractorCSV.read_csv_pandas(dataset_path)
+        return table.to_pandas()
+    
+    @staticmethod
+    def read_csv_pandas(dataset_path):
+        """Lee un CSV con el parser C de pandas (descomprime según la extensión)."""
+        options = dict(sep=CSV_SEPARATOR, encoding='utf-8-sig',
+                       na_values=CSV_NULL_VALUES, keep_default_na=False)
+        if pa is not None and dataset_path.endswith(CSV_COMPRESSED_EXTENSIONS):
+            # Descompresión en streaming con Arrow (gzip/zstd/bz2 sin dependencias extra)
+            with pa.input_stream(dataset_path) as source:
+                return pd.read_csv(source, **options)
+        return pd.read_csv(dataset_path, compression='infer', **options)
+    
+    @staticmethod
+    def extract_data(engine=None):
         """Extrae datos de los archivos CSV."""
         logger.info("====== INICIANDO FASE DE EXTRACCIÓN ======")
         dataframes = []
         
+        engine = engine or CSV_ENGINE
+        if engine == 'pyarrow' and pa_csv is None:
+            logger.warning("pyarrow no está instalado, usando el motor 'c' de pandas")
+            engine = 'c'
+        reader = ExtractorCSV.read_csv_pyarrow if engine == 'pyarrow' else ExtractorCSV.read_csv_pandas
+        
         datasets = [DATASET1_PATH, DATASET2_PATH]
         for dataset_path in datasets:
             try:
-                if not os.path.exists(dataset_path):
+                source_path = ExtractorCSV.resolve_path(dataset_path)
+                if source_path is None:
                     logger.warning(f"Archivo no encontrado: {dataset_path}, omitiendo...")
                     continue
                 
-                logger.info(f"Extrayendo datos de: {dataset_path}")
-                df = pd.read_csv(dataset_path, sep=';', encoding='utf-8')
-                logger.info(f" Registros extraídos de {dataset_path}: {len(df)}")
+                logger.info(f"Extrayendo datos de: {source_path} (motor: {engine})")
+                df = reader(source_path)
+                logger.info(f" Registros extraídos de {source_path}: {len(df)}")
                 dataframes.append(df)
             except Exception as e:
                 logger.error(f"Error al extraer {dataset_path}: {e}")
@@ -176,25 +291,183 @@ class Transformer:
             raise
 
 
+# ==================== SNAPSHOT COLUMNAR ====================
+class SnapshotParquet:
+    TABLAS = ['Dim_Pasajero', 'Dim_Tiempo', 'Dim_CanalVenta', 'Dim_MetodoPago', 'Dim_Moneda', 'Hecho_Venta']
+    
+    @staticmethod
+    def write_snapshot(connection, output_dir=None):
+        """Exporta el modelo estrella del data warehouse, un archivo Parquet por tabla.
+        
+        Se lee de SQL Server después de la carga, así que el snapshot es acumulado y
+        conserva los IDs del warehouse. Cada tabla se escribe primero en un archivo
+        temporal y todas se reemplazan al final, para no dejar un snapshot mezclado.
+        """
+        # Import diferido: exportacion configura logging al importarse
+        from exportacion import LectorArrow
+        
+        output_dir = output_dir or SNAPSHOT_DIR
+        logger.info(f"Generando snapshot Parquet en: {output_dir}")
+        
+        temporales = {}
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            lector = LectorArrow(connection)
+            for table in SnapshotParquet.TABLAS:
+                path = os.path.join(output_dir, f"{table}.parquet")
+                temporales[path] = path + '.tmp'
+                # Un row group por lote leído, con estadísticas min/max para que los
+                # lectores puedan descartar grupos completos al filtrar (predicate pushdown)
+                total = lector.exportar_parquet(f"SELECT * FROM {table}", temporales[path])
+                logger.info(f" {total} registros escritos en {table}.parquet")
+            for path, tmp in temporales.items():
+                os.replace(tmp, path)
+            return True
+        except Exception as e:
+            logger.error(f"Error generando snapshot Parquet: {e}")
+            for tmp in temporales.values():
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+            return False
+
+
+# ==================== AUTOTUNER DE LOTES ====================
+class TableBatchTuner:
+    """Ajusta el tamaño de lote de una tabla según las filas/seg medidas."""
+    
+    def __init__(self, table, initial_size, max_size):
+        self.table = table
+        self.max_size = max(BATCH_MIN_SIZE, max_size)
+        self.size = min(max(BATCH_MIN_SIZE, initial_size), self.max_size)
+        self.probing = True
+        self.best_size = self.size
+        self.best_rate = 0.0
+        self.ewma_rate = None
+        self.slow_batches = 0
+        self.reprobes = 0
+        self.batches = 0
+        self.rows = 0
+        self.seconds = 0.0
+    
+    def next_size(self):
+        """Tamaño del próximo lote."""
+        return self.size
+    
+    def record(self, rows, seconds):
+        """Registra la duración de un lote y decide el tamaño del siguiente."""
+        self.batches += 1
+        self.rows += rows
+        self.seconds += seconds
+        # Lotes incompletos (el último de la tabla) no son representativos
+        if rows < self.size or seconds <= 0:
+            return
+        rate = rows / seconds
+        
+        if self.probing:
+            # Fase de sondeo: duplicar mientras el rendimiento mejore lo suficiente
+            if rate > self.best_rate * (1 + BATCH_IMPROVEMENT):
+                self.best_size, self.best_rate = self.size, rate
+                if self.size < self.max_size:
+                    self.size = min(self.size * 2, self.max_size)
+                    return
+            self.probing = False
+            self.size = self.best_size
+            self.ewma_rate = self.best_rate
+            logger.info(f" Lote de {self.table} ajustado a {self.size} filas ({self.best_rate:,.0f} filas/seg)")
+            return
+        
+        # Fase estable: vigilar degradación con una media móvil exponencial
+        self.ewma_rate = BATCH_EWMA_ALPHA * rate + (1 - BATCH_EWMA_ALPHA) * self.ewma_rate
+        if self.ewma_rate < self.best_rate * (1 - BATCH_DEGRADATION):
+            self.slow_batches += 1
+        else:
+            self.slow_batches = 0
+        if self.slow_batches >= BATCH_DEGRADATION_PATIENCE:
+            # Volver a sondear desde un tamaño menor con la nueva referencia
+            logger.info(f" Rendimiento de {self.table} degradado ({self.ewma_rate:,.0f} filas/seg), reajustando lote")
+            self.reprobes += 1
+            self.probing = True
+            self.slow_batches = 0
+            self.best_rate = 0.0
+            self.size = max(BATCH_MIN_SIZE, self.best_size // 4)
+    
+    def metrics(self):
+        """Métricas del ajuste para el registro de la ejecución."""
+        return {
+            'batch_size': self.best_size,
+            'rows_per_sec': round(self.best_rate, 1),
+            'batches': self.batches,
+            'rows': self.rows,
+            'seconds': round(self.seconds, 3),
+            'reprobes': self.reprobes
+        }
+
+
+class BatchSizeTuner:
+    """Autotuners por tabla; parte de los tamaños elegidos en la ejecución anterior."""
+    
+    def __init__(self, previous=None):
+        self.previous = previous or {}
+        self.tables = {}
+    
+    @staticmethod
+    def load(path=None):
+        """Carga las métricas de la ejecución anterior, si existen."""
+        path = path or ETL_METRICS_PATH
+        try:
+            with open(path, encoding='utf-8') as f:
+                previous = json.load(f).get('batch_sizes', {})
+        except (OSError, ValueError):
+            previous = {}
+        return BatchSizeTuner(previous)
+    
+    def for_table(self, table, row_bytes):
+        """Autotuner de una tabla, limitado por el tope de memoria por lote."""
+        if table not in self.tables:
+            initial = self.previous.get(table, {}).get('batch_size', BATCH_INITIAL_SIZE)
+            max_size = int(BATCH_MAX_BYTES // max(row_bytes, 1))
+            self.tables[table] = TableBatchTuner(table, initial, max_size)
+        return self.tables[table]
+    
+    def save(self, path=None):
+        """Guarda los tamaños elegidos en las métricas de la ejecución."""
+        path = path or ETL_METRICS_PATH
+        # Las tablas sin lotes completos medidos conservan el tamaño anterior
+        measured = {t: tuner.metrics() for t, tuner in self.tables.items() if tuner.best_rate > 0}
+        metrics = {
+            'run_at': datetime.now().isoformat(timespec='seconds'),
+            'batch_sizes': {**self.previous, **measured}
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(metrics, f, indent=2)
+        return metrics
+
+
 # ==================== FASE 3: CARGA ====================
 class Loader:
+    # Tabla de dimensión -> columna ID
+    ID_COLUMNS = {
+        'Dim_Pasajero': 'id_pasajero',
+        'Dim_Tiempo': 'id_tiempo',
+        'Dim_CanalVenta': 'id_canal',
+        'Dim_MetodoPago': 'id_metodo_pago',
+        'Dim_Moneda': 'id_moneda'
+    }
+    
     def __init__(self):
         self.connection = None
         self.cursor = None
+        self.tuner = BatchSizeTuner.load(ETL_METRICS_PATH)
+        # Por tabla: filas de `rows` ya confirmadas y filas insertadas en esta ejecución
+        self.committed = {}
+        self.inserted = {}
+        # Sketches de las ventas confirmadas en esta ejecución
+        self.sketches = SketchesKPI()
     
     def connect(self):
-        """Establece conexión con SQL Server."""
+        """Obtiene una conexión del pool compartido de SQL Server."""
         try:
-            connection_string = (
-                f"Driver={DATABASE_CONFIG['Driver']};"
-                f"Server={DATABASE_CONFIG['Server']};"
-                f"Database={DATABASE_CONFIG['Database']};"
-                f"UID={DATABASE_CONFIG['UID']};"
-                f"PWD={DATABASE_CONFIG['PWD']};"
-                f"Encrypt=yes;"
-                f"TrustServerCertificate=yes"
-            )
-            self.connection = pyodbc.connect(connection_string)
+            self.connection = get_pool().obtener()
             self.cursor = self.connection.cursor()
             logger.info(" Conectado a SQL Server")
             return True
@@ -203,43 +476,138 @@ class Loader:
             return False
     
     def disconnect(self):
-        """Cierra la conexión con SQL Server."""
+        """Devuelve la conexión al pool."""
         if self.cursor:
-            self.cursor.close()
-        if self.connection:
-            self.connection.close()
+            try:
+                self.cursor.close()
+            except pyodbc.Error:
+                pass
+        get_pool().liberar(self.connection)
+        self.connection = None
+        self.cursor = None
         logger.info("Desconectado de SQL Server")
     
-    def insert_pasajeros(self, df):
-        """Inserta datos en Dim_Pasajero."""
-        logger.info("Insertando pasajeros en Dim_Pasajero...")
+    def reconnect(self):
+        """Descarta la conexión actual (caída) y obtiene otra del pool."""
+        logger.warning("Reconectando a SQL Server...")
+        if self.connection is not None:
+            get_pool().descartar(self.connection)
+        self.connection = get_pool().obtener()
+        self.cursor = self.connection.cursor()
+    
+    def run_step(self, step, df):
+        """Ejecuta un paso de carga; ante un error transitorio reconecta y repite el paso.
+        
+        En las dimensiones cada lote se confirma por separado e insert_rows recuerda
+        cuántas filas quedaron confirmadas, así que al repetir el paso se reanuda desde
+        el primer lote pendiente. Las ventas se cargan en una tabla temporal de la
+        sesión y pasan a Hecho_Venta en una sola sentencia, así que al reconectar el
+        paso empieza de nuevo sin haber dejado ventas a medias.
+        """
+        return con_reintentos(step, df, al_fallar=self.reconnect)
+    
+    def insert_rows(self, table, sql, rows, describe, al_insertar=None):
+        """Inserta filas en lotes con executemany; el autotuner elige el tamaño de cada lote.
+        
+        Cada lote se confirma en su propia transacción. Si un lote falla se revierte y
+        sus filas se insertan una por una, omitiendo duplicados y registrando las filas
+        con error. `al_insertar` recibe, por cada lote confirmado, las posiciones en
+        `rows` de las filas insertadas.
+        """
+        if not rows:
+            return 0
+        sample = rows[:100]
+        row_bytes = sum(sys.getsizeof(v) for row in sample for v in row) / len(sample)
+        tuner = self.tuner.for_table(table, row_bytes)
+        self.cursor.fast_executemany = True
         inserted = 0
+        pos = self.committed.get(table, 0)
+        if pos:
+            logger.info(f" Reanudando {table} desde la fila {pos} (lotes ya confirmados)")
         
-        try:
-            for _, row in df.iterrows():
+        while pos < len(rows):
+            start_pos = pos
+            batch = rows[pos:pos + tuner.next_size()]
+            pos += len(batch)
+            start = time.perf_counter()
+            try:
+                self.cursor.executemany(sql, batch)
+                self.connection.commit()
+            except Exception as e:
+                if es_error_transitorio(e):
+                    raise
+                # Solo el lote actual está sin confirmar
+                self.connection.rollback()
+            else:
+                tuner.record(len(batch), time.perf_counter() - start)
+                self.mark_committed(table, pos, len(batch))
+                inserted += len(batch)
+                if al_insertar is not None:
+                    al_insertar(range(start_pos, pos))
+                continue
+            
+            ok = []
+            for offset, row in enumerate(batch):
                 try:
-                    sql = """
-                        INSERT INTO Dim_Pasajero (passenger_id, passenger_gender, passenger_age, passenger_nationality)
-                        VALUES (?, ?, ?, ?)
-                    """
-                    self.cursor.execute(sql, (
-                        row['passenger_id'],
-                        row['passenger_gender'],
-                        int(row['passenger_age']),
-                        row['passenger_nationality']
-                    ))
+                    self.cursor.execute(sql, row)
                     inserted += 1
+                    ok.append(start_pos + offset)
                 except pyodbc.IntegrityError:
-                    # Pasajero ya existe, continuar
+                    # Registro ya existe, continuar
                     continue
                 except Exception as e:
-                    logger.warning(f"Error insertando pasajero {row['passenger_id']}: {e}")
+                    if es_error_transitorio(e):
+                        raise
+                    logger.warning(f"Error insertando {describe(row)}: {e}")
                     continue
-            
             self.connection.commit()
+            self.mark_committed(table, pos, len(ok))
+            if al_insertar is not None and ok:
+                al_insertar(ok)
+        return inserted
+    
+    def mark_committed(self, table, pos, rows):
+        """Registra el avance confirmado de una tabla."""
+        self.committed[table] = pos
+        self.inserted[table] = self.inserted.get(table, 0) + rows
+    
+    @staticmethod
+    def count_committed(table):
+        """Cuenta las filas confirmadas de una tabla desde otra conexión del pool."""
+        pool = get_pool()
+        connection = pool.obtener()
+        try:
+            cursor = connection.cursor()
+            count = cursor.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            cursor.close()
+            return count
+        finally:
+            pool.liberar(connection)
+    
+    def insert_pasajeros(self, df):
+        """Inserta datos en Dim_Pasajero."""
+        logger.info("Insertando pasajeros en Dim_Pasajero...")
+        
+        try:
+            # Igual que con la restricción UNIQUE, el primer registro de cada pasajero gana
+            pasajeros = df.drop_duplicates(subset='passenger_id', keep='first')
+            rows = list(zip(
+                pasajeros['passenger_id'].tolist(),
+                pasajeros['passenger_gender'].tolist(),
+                pasajeros['passenger_age'].astype(int).tolist(),
+                pasajeros['passenger_nationality'].tolist()
+            ))
+            sql = """
+                INSERT INTO Dim_Pasajero (passenger_id, passenger_gender, passenger_age, passenger_nationality)
+                VALUES (?, ?, ?, ?)
+            """
+            inserted = self.insert_rows('Dim_Pasajero', sql, rows, lambda row: f"pasajero {row[0]}")
+            
             logger.info(f" {inserted} pasajeros insertados en Dim_Pasajero")
             return inserted
         except Exception as e:
+            if es_error_transitorio(e):
+                raise
             logger.error(f"Error en insert_pasajeros: {e}")
             self.connection.rollback()
             return 0
@@ -247,34 +615,24 @@ class Loader:
     def insert_tiempos(self, df):
         """Inserta datos en Dim_Tiempo."""
         logger.info("Insertando tiempos en Dim_Tiempo...")
-        inserted = 0
         
         try:
-            unique_dates = df['booking_datetime'].unique()
-            for date in unique_dates:
-                try:
-                    sql = """
-                        INSERT INTO Dim_Tiempo (booking_datetime, anio, mes, dia, hora)
-                        VALUES (?, ?, ?, ?, ?)
-                    """
-                    self.cursor.execute(sql, (
-                        date,
-                        date.year,
-                        date.month,
-                        date.day,
-                        date.hour
-                    ))
-                    inserted += 1
-                except pyodbc.IntegrityError:
-                    continue
-                except Exception as e:
-                    logger.warning(f"Error insertando tiempo {date}: {e}")
-                    continue
+            unique_dates = pd.DatetimeIndex(df['booking_datetime'].unique())
+            rows = [
+                (date.to_pydatetime(), date.year, date.month, date.day, date.hour)
+                for date in unique_dates
+            ]
+            sql = """
+                INSERT INTO Dim_Tiempo (booking_datetime, anio, mes, dia, hora)
+                VALUES (?, ?, ?, ?, ?)
+            """
+            inserted = self.insert_rows('Dim_Tiempo', sql, rows, lambda row: f"tiempo {row[0]}")
             
-            self.connection.commit()
             logger.info(f" {inserted} tiempos insertados en Dim_Tiempo")
             return inserted
         except Exception as e:
+            if es_error_transitorio(e):
+                raise
             logger.error(f"Error en insert_tiempos: {e}")
             self.connection.rollback()
             return 0
@@ -282,25 +640,17 @@ class Loader:
     def insert_canales(self, df):
         """Inserta datos en Dim_CanalVenta."""
         logger.info("Insertando canales en Dim_CanalVenta...")
-        inserted = 0
         
         try:
-            unique_channels = df['sales_channel'].unique()
-            for channel in unique_channels:
-                try:
-                    sql = "INSERT INTO Dim_CanalVenta (sales_channel) VALUES (?)"
-                    self.cursor.execute(sql, (channel,))
-                    inserted += 1
-                except pyodbc.IntegrityError:
-                    continue
-                except Exception as e:
-                    logger.warning(f"Error insertando canal {channel}: {e}")
-                    continue
+            rows = [(channel,) for channel in df['sales_channel'].unique().tolist()]
+            sql = "INSERT INTO Dim_CanalVenta (sales_channel) VALUES (?)"
+            inserted = self.insert_rows('Dim_CanalVenta', sql, rows, lambda row: f"canal {row[0]}")
             
-            self.connection.commit()
             logger.info(f" {inserted} canales insertados en Dim_CanalVenta")
             return inserted
         except Exception as e:
+            if es_error_transitorio(e):
+                raise
             logger.error(f"Error en insert_canales: {e}")
             self.connection.rollback()
             return 0
@@ -308,25 +658,17 @@ class Loader:
     def insert_metodos_pago(self, df):
         """Inserta datos en Dim_MetodoPago."""
         logger.info("Insertando métodos de pago en Dim_MetodoPago...")
-        inserted = 0
         
         try:
-            unique_methods = df['payment_method'].unique()
-            for method in unique_methods:
-                try:
-                    sql = "INSERT INTO Dim_MetodoPago (payment_method) VALUES (?)"
-                    self.cursor.execute(sql, (method,))
-                    inserted += 1
-                except pyodbc.IntegrityError:
-                    continue
-                except Exception as e:
-                    logger.warning(f"Error insertando método {method}: {e}")
-                    continue
+            rows = [(method,) for method in df['payment_method'].unique().tolist()]
+            sql = "INSERT INTO Dim_MetodoPago (payment_method) VALUES (?)"
+            inserted = self.insert_rows('Dim_MetodoPago', sql, rows, lambda row: f"método {row[0]}")
             
-            self.connection.commit()
             logger.info(f" {inserted} métodos insertados en Dim_MetodoPago")
             return inserted
         except Exception as e:
+            if es_error_transitorio(e):
+                raise
             logger.error(f"Error en insert_metodos_pago: {e}")
             self.connection.rollback()
             return 0
@@ -334,97 +676,134 @@ class Loader:
     def insert_monedas(self, df):
         """Inserta datos en Dim_Moneda."""
         logger.info("Insertando monedas en Dim_Moneda...")
-        inserted = 0
         
         try:
-            unique_currencies = df['currency'].unique()
-            for currency in unique_currencies:
-                try:
-                    sql = "INSERT INTO Dim_Moneda (currency) VALUES (?)"
-                    self.cursor.execute(sql, (currency,))
-                    inserted += 1
-                except pyodbc.IntegrityError:
-                    continue
-                except Exception as e:
-                    logger.warning(f"Error insertando moneda {currency}: {e}")
-                    continue
+            rows = [(currency,) for currency in df['currency'].unique().tolist()]
+            sql = "INSERT INTO Dim_Moneda (currency) VALUES (?)"
+            inserted = self.insert_rows('Dim_Moneda', sql, rows, lambda row: f"moneda {row[0]}")
             
-            self.connection.commit()
             logger.info(f" {inserted} monedas insertadas en Dim_Moneda")
             return inserted
         except Exception as e:
+            if es_error_transitorio(e):
+                raise
             logger.error(f"Error en insert_monedas: {e}")
             self.connection.rollback()
             return 0
     
-    def get_id_from_dimension(self, table, column, value):
-        """Obtiene el ID de una dimensión."""
+    @staticmethod
+    def normalize_key(values):
+        """Normaliza claves de texto como las compara SQL Server (sin distinguir
+        mayúsculas y sin espacios finales); las demás claves no cambian."""
+        if pd.api.types.infer_dtype(values, skipna=True) == 'string':
+            return values.str.rstrip().str.upper()
+        return values
+    
+    def get_dimension_map(self, table, column):
+        """Obtiene el mapeo clave normalizada -> ID de toda una dimensión en una sola consulta."""
+        id_column = self.ID_COLUMNS[table]
+        # Con valores repetidos se usa el primer ID
+        sql = f"SELECT {column}, MIN({id_column}) FROM {table} GROUP BY {column}"
+        self.cursor.execute(sql)
+        result = self.cursor.fetchall()
+        keys = self.normalize_key(pd.Series([row[0] for row in result], dtype=object))
+        mapping = {}
+        for key, id_value in zip(keys.tolist(), [row[1] for row in result]):
+            mapping[key] = min(id_value, mapping.get(key, id_value))
+        return mapping
+    
+    def save_sketches(self):
+        """Fusiona los sketches de las ventas confirmadas con los persistidos."""
+        if not SKETCHES_PATH or not self.sketches.total_ventas:
+            return
         try:
-            # Mapeo correcto de nombres de tabla a columna ID
-            id_column_map = {
-                'Dim_Pasajero': 'id_pasajero',
-                'Dim_Tiempo': 'id_tiempo',
-                'Dim_CanalVenta': 'id_canal',
-                'Dim_MetodoPago': 'id_metodo_pago',
-                'Dim_Moneda': 'id_moneda'
-            }
-            
-            id_column = id_column_map.get(table, f'id_{table.lower().replace("dim_", "")}')
-            sql = f"SELECT {id_column} FROM {table} WHERE {column} = ?"
-            self.cursor.execute(sql, (value,))
-            result = self.cursor.fetchone()
-            return result[0] if result else None
+            persisted = SketchesKPI.load(SKETCHES_PATH)
+            persisted.merge(self.sketches)
+            persisted.save(SKETCHES_PATH)
+            logger.info(f" Sketches de KPIs actualizados en {SKETCHES_PATH}")
         except Exception as e:
-            logger.warning(f"Error obteniendo ID de {table}: {e}")
-            return None
+            logger.error(f"Error actualizando sketches de KPIs: {e}")
     
     def insert_ventas(self, df):
-        """Inserta datos en Hecho_Venta."""
+        """Inserta datos en Hecho_Venta.
+        
+        Los lotes se insertan en STAGING_TABLE y las ventas pasan a Hecho_Venta en
+        una sola transacción: si la carga falla, Hecho_Venta queda como estaba y
+        volver a ejecutar el ETL no duplica ventas.
+        """
         logger.info("====== INICIANDO FASE DE CARGA ======")
         logger.info("Insertando ventas en Hecho_Venta...")
-        inserted = 0
+        
+        # La tabla temporal no sobrevive a una reconexión: cada intento empieza de cero
+        self.committed.pop('Hecho_Venta', None)
+        self.inserted.pop('Hecho_Venta', None)
+        self.sketches = SketchesKPI()
+        columns = ("id_pasajero, id_tiempo, id_canal, id_metodo_pago, id_moneda, "
+                   "ticket_price, ticket_price_usd_est, bags_total, bags_checked")
         
         try:
-            for _, row in df.iterrows():
-                try:
-                    id_pasajero = self.get_id_from_dimension('Dim_Pasajero', 'passenger_id', row['passenger_id'])
-                    id_tiempo = self.get_id_from_dimension('Dim_Tiempo', 'booking_datetime', row['booking_datetime'])
-                    id_canal = self.get_id_from_dimension('Dim_CanalVenta', 'sales_channel', row['sales_channel'])
-                    id_metodo = self.get_id_from_dimension('Dim_MetodoPago', 'payment_method', row['payment_method'])
-                    id_moneda = self.get_id_from_dimension('Dim_Moneda', 'currency', row['currency'])
-                    
-                    if all([id_pasajero, id_tiempo, id_canal, id_metodo, id_moneda]):
-                        sql = """
-                            INSERT INTO Hecho_Venta 
-                            (id_pasajero, id_tiempo, id_canal, id_metodo_pago, id_moneda, 
-                             ticket_price, ticket_price_usd_est, bags_total, bags_checked)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """
-                        self.cursor.execute(sql, (
-                            id_pasajero,
-                            id_tiempo,
-                            id_canal,
-                            id_metodo,
-                            id_moneda,
-                            float(row['ticket_price']),
-                            float(row['ticket_price_usd_est']),
-                            int(row['bags_total']),
-                            int(row['bags_checked'])
-                        ))
-                        inserted += 1
-                    else:
-                        logger.warning(f"IDs incompletos para venta {row['passenger_id']}")
-                except Exception as e:
-                    logger.warning(f"Error insertando venta: {e}")
-                    continue
+            # Resolver las claves de todas las ventas con un mapeo por dimensión
+            dimensions = [
+                ('Dim_Pasajero', 'passenger_id'),
+                ('Dim_Tiempo', 'booking_datetime'),
+                ('Dim_CanalVenta', 'sales_channel'),
+                ('Dim_MetodoPago', 'payment_method'),
+                ('Dim_Moneda', 'currency')
+            ]
+            ids = pd.DataFrame(index=df.index)
+            for table, column in dimensions:
+                mapping = self.get_dimension_map(table, column)
+                ids[column] = self.normalize_key(df[column]).map(mapping)
+            
+            complete = ids.notna().all(axis=1)
+            for passenger_id in df.loc[~complete, 'passenger_id']:
+                logger.warning(f"IDs incompletos para venta {passenger_id}")
+            
+            ventas = df[complete]
+            ids = ids[complete].astype(int)
+            rows = list(zip(
+                ids['passenger_id'].tolist(),
+                ids['booking_datetime'].tolist(),
+                ids['sales_channel'].tolist(),
+                ids['payment_method'].tolist(),
+                ids['currency'].tolist(),
+                ventas['ticket_price'].astype(float).tolist(),
+                ventas['ticket_price_usd_est'].astype(float).tolist(),
+                ventas['bags_total'].astype(int).tolist(),
+                ventas['bags_checked'].astype(int).tolist()
+            ))
+            self.cursor.execute(f"""
+                IF OBJECT_ID('tempdb..{STAGING_TABLE}') IS NOT NULL DROP TABLE {STAGING_TABLE};
+                SELECT TOP 0 {columns} INTO {STAGING_TABLE} FROM Hecho_Venta
+            """)
+            self.connection.commit()
+            
+            sql = f"""
+                INSERT INTO {STAGING_TABLE} ({columns})
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """
+            # Sketches de las ventas cargadas, lote a lote; se persisten solo si pasan a Hecho_Venta
+            inserted = self.insert_rows(
+                'Hecho_Venta', sql, rows, lambda row: f"venta del pasajero {row[0]}",
+                al_insertar=lambda posiciones: self.sketches.update(ventas.iloc[list(posiciones)])
+            )
             
+            self.cursor.execute(f"INSERT INTO Hecho_Venta ({columns}) SELECT {columns} FROM {STAGING_TABLE}")
+            self.connection.commit()
+            self.cursor.execute(f"DROP TABLE {STAGING_TABLE}")
             self.connection.commit()
+            self.save_sketches()
+            
             logger.info(f"{inserted} ventas insertadas en Hecho_Venta")
             logger.info("Carga completada exitosamente")
             return inserted
         except Exception as e:
+            if es_error_transitorio(e):
+                raise
             logger.error(f"Error en insert_ventas: {e}")
             self.connection.rollback()
+            # Ninguna venta llegó a Hecho_Venta
+            self.inserted.pop('Hecho_Venta', None)
             return 0
 
 
@@ -458,14 +837,36 @@ def run_etl():
         
         try:
             # Insertar dimensiones (orden importante para las claves foráneas)
-            loader.insert_pasajeros(df_clean)
-            loader.insert_tiempos(df_clean)
-            loader.insert_canales(df_clean)
-            loader.insert_metodos_pago(df_clean)
-            loader.insert_monedas(df_clean)
+            loader.run_step(loader.insert_pasajeros, df_clean)
+            loader.run_step(loader.insert_tiempos, df_clean)
+            loader.run_step(loader.insert_canales, df_clean)
+            loader.run_step(loader.insert_metodos_pago, df_clean)
+            loader.run_step(loader.insert_monedas, df_clean)
             
             # Insertar tabla de hechos
-            loader.insert_ventas(df_clean)
+            ventas_antes = loader.count_committed('Hecho_Venta')
+            loader.run_step(loader.insert_ventas, df_clean)
+            
+            # Verificar desde otra conexión que las ventas quedaron confirmadas
+            confirmadas = loader.count_committed('Hecho_Venta') - ventas_antes
+            esperadas = loader.inserted.get('Hecho_Venta', 0)
+            if confirmadas != esperadas:
+                logger.error(f"Hecho_Venta: {esperadas} ventas insertadas pero {confirmadas} "
+                             f"visibles desde otra conexión")
+                return False
+            
+            # Snapshot columnar del warehouse para consultas sin conexión a la base de datos
+            if SNAPSHOT_DIR:
+                SnapshotParquet.write_snapshot(loader.connection)
+            
+            # Registrar los tamaños de lote elegidos para la próxima ejecución
+            try:
+                metrics = loader.tuner.save(ETL_METRICS_PATH)
+                for table, table_metrics in metrics['batch_sizes'].items():
+                    logger.info(f" Lote {table}: {table_metrics['batch_size']} filas "
+                                f"({table_metrics['rows_per_sec']:,.0f} filas/seg)")
+            except Exception as e:
+                logger.error(f"Error guardando métricas de la ejecución: {e}")
             
             logger.info("\n" + "="*60)
             logger.info("PROCESO ETL COMPLETADO EXITOSAMENTE")
@@ -481,4 +882,5 @@ def run_etl():
 
 if __name__ == "__main__":
     success = run_etl()
+    get_pool().cerrar()
     sys.exit(0 if success else 1)
@@ -0,0 +1,106 @@
+import bz2
+import gzip
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from ETL import ExtractorCSV, Transformer, DATASET2_PATH, CSV_MMAP_MIN_BYTES, pa
+
+# ==================== CONFIGURACIÓN ====================
+# Veces que se replica Dataset 2 para construir la entrada sintética
+# (por defecto ~95 MB, por encima de CSV_MMAP_MIN_BYTES para medir el memory-map)
+REPLICAS = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+REPETICIONES = 3
+
+
+def generar_entrada_sintetica(directorio):
+    """Replica Dataset 2 para generar archivos grandes (plano y comprimidos)."""
+    with open(DATASET2_PATH, 'rb') as f:
+        header = f.readline()
+        body = f.read()
+    if not body.endswith(b'\n'):
+        body += b'\n'
+
+    plano = os.path.join(directorio, 'sintetico.csv')
+    with open(plano, 'wb') as f:
+        f.write(header)
+        for _ in range(REPLICAS):
+            f.write(body)
+
+    with open(plano, 'rb') as f:
+        data = f.read()
+    archivos = {'plano': plano}
+
+    with gzip.open(plano + '.gz', 'wb', compresslevel=6) as f:
+        f.write(data)
+    archivos['gzip'] = plano + '.gz'
+
+    with bz2.open(plano + '.bz2', 'wb') as f:
+        f.write(data)
+    archivos['bz2'] = plano + '.bz2'
+
+    if pa is not None and pa.Codec.is_available('zstd'):
+        with pa.CompressedOutputStream(plano + '.zst', 'zstd') as f:
+            f.write(data)
+        archivos['zstd'] = plano + '.zst'
+
+    return archivos
+
+
+def verificar_motores():
+    """Verifica que ambos motores produzcan el mismo DataFrame después de la transformación."""
+    if pa is None:
+        return
+    resultados = {
+        motor: Transformer.transform_data(ExtractorCSV.extract_data(engine=motor))
+        for motor in ('c', 'pyarrow')
+    }
+    pd.testing.assert_frame_equal(resultados['c'], resultados['pyarrow'])
+    print(f"Motores equivalentes: {len(resultados['c'])} registros idénticos tras la transformación")
+
+
+def medir(reader, path):
+    """Retorna el mejor tiempo de varias lecturas y la cantidad de registros."""
+    mejor = None
+    filas = 0
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        df = reader(path)
+        duracion = time.perf_counter() - inicio
+        filas = len(df)
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor, filas
+
+
+def main():
+    motores = {'c': ExtractorCSV.read_csv_pandas}
+    if pa is not None:
+        motores['pyarrow'] = ExtractorCSV.read_csv_pyarrow
+
+    verificar_motores()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        archivos = generar_entrada_sintetica(directorio)
+        tamano = os.path.getsize(archivos['plano'])
+        print(f"Entrada sintética: {REPLICAS} réplicas, {tamano / 1024 / 1024:.1f} MB sin comprimir "
+              f"(memory-map desde {CSV_MMAP_MIN_BYTES / 1024 / 1024:.0f} MB)")
+        if tamano < CSV_MMAP_MIN_BYTES:
+            print("Aviso: la entrada plana no alcanza el umbral, no se mide la lectura con memory-map")
+        print(f"{'Formato':<8} {'Motor':<8} {'Registros':>10} {'Segundos':>9} {'MB/s':>8}")
+
+        for formato, path in archivos.items():
+            for motor, reader in motores.items():
+                try:
+                    duracion, filas = medir(reader, path)
+                except ImportError as e:
+                    print(f"{formato:<8} {motor:<8} {'no disponible':>10} ({e})")
+                    continue
+                print(f"{formato:<8} {motor:<8} {filas:>10} {duracion:>9.3f} "
+                      f"{tamano / 1024 / 1024 / duracion:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import logging
+import queue
+import random
+import threading
+import time
+
+import pyodbc
+
+logger = logging.getLogger(__name__)
+
+# ==================== CONFIGURACIÓN ====================
+DATABASE_CONFIG = {
+    'Server': 'localhost,1433',
+    'Database': 'Semi2_P1',
+    'UID': 'sa',
+    'PWD': 'PasswordSegura123!',
+    'Driver': '{ODBC Driver 18 for SQL Server}'
+}
+
+# Conexiones abiertas que el pool mantiene listas para reutilizar
+POOL_SIZE = 4
+# Segundos de inactividad tras los cuales se verifica la conexión antes de entregarla
+HEALTH_CHECK_IDLE_SECONDS = 30
+# Reintentos con backoff exponencial (base * 2^intento, con jitter, hasta el máximo)
+MAX_RETRIES = 5
+RETRY_BASE_SECONDS = 0.5
+RETRY_MAX_SECONDS = 30
+# Ajustes de sesión aplicados a cada conexión nueva
+LOGIN_TIMEOUT_SECONDS = 15
+PACKET_SIZE = 32767
+SESSION_STATEMENTS = ['SET NOCOUNT ON']
+
+# Atributo ODBC SQL_ATTR_PACKET_SIZE (se fija antes de conectar)
+SQL_ATTR_PACKET_SIZE = 112
+
+# SQLSTATEs transitorios: caída de enlace, conexión rechazada, timeout, deadlock
+TRANSIENT_SQLSTATES = {'08001', '08003', '08S01', '08S02', 'HYT00', 'HYT01', '40001'}
+# Errores nativos de SQL Server que indican indisponibilidad temporal
+TRANSIENT_NATIVE_ERRORS = {1205, 4060, 10053, 10054, 10928, 10929, 40197, 40501, 40613, 49918}
+
+
+def build_connection_string(config=None):
+    """Construye la cadena de conexión ODBC a partir de DATABASE_CONFIG."""
+    config = config or DATABASE_CONFIG
+    return (
+        f"Driver={config['Driver']};"
+        f"Server={config['Server']};"
+        f"Database={config['Database']};"
+        f"UID={config['UID']};"
+        f"PWD={config['PWD']};"
+        f"Encrypt=yes;"
+        f"TrustServerCertificate=yes"
+    )
+
+
+def es_error_transitorio(error):
+    """Indica si un error de pyodbc es transitorio y la operación puede reintentarse."""
+    if not isinstance(error, pyodbc.Error):
+        return False
+    sqlstate = error.args[0] if error.args else ''
+    if sqlstate in TRANSIENT_SQLSTATES:
+        return True
+    mensaje = str(error)
+    return any(f"({codigo})" in mensaje for codigo in TRANSIENT_NATIVE_ERRORS)
+
+
+def backoff(intento):
+    """Segundos de espera antes del reintento número `intento` (desde 0)."""
+    espera = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * (2 ** intento))
+    return espera * random.uniform(0.5, 1.0)
+
+
+def con_reintentos(func, *args, al_fallar=None, **kwargs):
+    """Ejecuta func reintentando con backoff exponencial ante errores transitorios.
+
+    `al_fallar` se invoca tras cada fallo transitorio (por ejemplo, para reconectar).
+    """
+    for intento in range(MAX_RETRIES + 1):
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if not es_error_transitorio(e) or intento == MAX_RETRIES:
+                raise
+            espera = backoff(intento)
+            logger.warning(f"Error transitorio ({e}), reintento {intento + 1}/{MAX_RETRIES} en {espera:.1f}s")
+            time.sleep(espera)
+            if al_fallar is not None:
+                al_fallar()
+
+
+class PoolConexiones:
+    """Pool thread-safe de conexiones pyodbc ya abiertas y configuradas."""
+
+    def __init__(self, size=None, config=None):
+        self.size = size or POOL_SIZE
+        self.connection_string = build_connection_string(config)
+        self._idle = queue.LifoQueue(maxsize=self.size)
+        self._last_used = {}
+        self._lock = threading.Lock()
+
+    def _abrir(self):
+        connection = pyodbc.connect(
+            self.connection_string,
+            autocommit=False,
+            timeout=LOGIN_TIMEOUT_SECONDS,
+            attrs_before={SQL_ATTR_PACKET_SIZE: PACKET_SIZE}
+        )
+        cursor = connection.cursor()
+        for statement in SESSION_STATEMENTS:
+            cursor.execute(statement)
+        cursor.close()
+        connection.commit()
+        return connection
+
+    def abrir(self):
+        """Abre una conexión nueva, reintentando ante fallos transitorios."""
+        connection = con_reintentos(self._abrir)
+        logger.info(" Nueva conexión a SQL Server en el pool")
+        return connection
+
+    @staticmethod
+    def esta_viva(connection):
+        """Verifica la conexión con una consulta mínima."""
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1").fetchone()
+            cursor.close()
+            return True
+        except pyodbc.Error:
+            return False
+
+    def obtener(self):
+        """Entrega una conexión del pool (o una nueva si no hay disponibles)."""
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                return self.abrir()
+
+            with self._lock:
+                last_used = self._last_used.pop(id(connection), 0)
+            if time.monotonic() - last_used < HEALTH_CHECK_IDLE_SECONDS or self.esta_viva(connection):
+                return connection
+            logger.warning("Conexión inactiva no responde, se descarta")
+            self.descartar(connection)
+
+    def liberar(self, connection):
+        """Devuelve una conexión al pool; si el pool está lleno o falla, se cierra."""
+        if connection is None:
+            return
+        try:
+            connection.rollback()
+        except pyodbc.Error:
+            self.descartar(connection)
+            return
+        with self._lock:
+            self._last_used[id(connection)] = time.monotonic()
+        try:
+            self._idle.put_nowait(connection)
+        except queue.Full:
+            with self._lock:
+                self._last_used.pop(id(connection), None)
+            self.descartar(connection)
+
+    @staticmethod
+    def descartar(connection):
+        """Cierra una conexión sin devolverla al pool."""
+        try:
+            connection.close()
+        except pyodbc.Error:
+            pass
+
+    def cerrar(self):
+        """Cierra todas las conexiones inactivas del pool."""
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self.descartar(connection)
+        with self._lock:
+            self._last_used.clear()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Pool compartido por el ETL, la visualización y la exportación."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PoolConexiones()
+        return _pool
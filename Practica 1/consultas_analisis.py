@@ -0,0 +1,240 @@
+import os
+import logging
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Directorio del snapshot Parquet generado por el ETL
+SNAPSHOT_DIR = 'snapshot'
+
+# Rangos de edad usados en consultas_analisis.sql (límites inclusivos)
+RANGOS_EDAD = [(0, 18, '0-18'), (19, 30, '19-30'), (31, 45, '31-45'), (46, 60, '46-60')]
+
+
+class ConsultasSnapshot:
+    """Reproduce las consultas de consultas_analisis.sql sobre el snapshot Parquet."""
+
+    def __init__(self, snapshot_dir=None):
+        self.snapshot_dir = snapshot_dir or SNAPSHOT_DIR
+        self._cache = {}
+
+    def leer_tabla(self, tabla, columnas, filtros=None):
+        """Lee solo las columnas y filas necesarias de una tabla del snapshot."""
+        key = (tabla, tuple(columnas), repr(filtros))
+        if key not in self._cache:
+            path = os.path.join(self.snapshot_dir, f"{tabla}.parquet")
+            # Poda de columnas y de grupos de filas (predicate pushdown) en el lector
+            table = pq.read_table(path, columns=list(columnas), filters=filtros)
+            # Los DECIMAL del warehouse se convierten a float64 para operar con NumPy
+            schema = pa.schema([
+                pa.field(f.name, pa.float64()) if pa.types.is_decimal(f.type) else f
+                for f in table.schema
+            ])
+            self._cache[key] = table.cast(schema).to_pandas()
+        return self._cache[key]
+
+    def atributo_dimension(self, hecho, id_column, dim, columna):
+        """Resuelve un atributo de dimensión para cada venta (equivale a un INNER JOIN)."""
+        posiciones = pd.Index(dim[id_column]).get_indexer(hecho[id_column])
+        mask = posiciones >= 0
+        valores = dim[columna].to_numpy()[posiciones[mask]]
+        return valores, mask
+
+    @staticmethod
+    def agrupar(claves, medidas=None):
+        """Cuenta y suma medidas por clave de forma vectorizada."""
+        codes, uniques = pd.factorize(claves)
+        total = np.bincount(codes, minlength=len(uniques))
+        resultado = {'clave': uniques, 'Total': total}
+        for nombre, valores in (medidas or {}).items():
+            resultado[nombre] = np.bincount(codes, weights=valores, minlength=len(uniques))
+        return pd.DataFrame(resultado)
+
+    def _total_ventas(self):
+        return len(self.leer_tabla('Hecho_Venta', ['id_venta']))
+
+    def validar_carga(self):
+        """Consulta 1: cantidad de registros por tabla."""
+        tablas = [
+            ('Pasajeros', 'Dim_Pasajero', 'id_pasajero'),
+            ('Tiempos', 'Dim_Tiempo', 'id_tiempo'),
+            ('Canales', 'Dim_CanalVenta', 'id_canal'),
+            ('Métodos Pago', 'Dim_MetodoPago', 'id_metodo_pago'),
+            ('Monedas', 'Dim_Moneda', 'id_moneda'),
+            ('Ventas', 'Hecho_Venta', 'id_venta')
+        ]
+        return pd.DataFrame({
+            'Tabla': [nombre for nombre, _, _ in tablas],
+            'Total': [len(self.leer_tabla(tabla, [id_column])) for _, tabla, id_column in tablas]
+        })
+
+    def total_vuelos(self):
+        """Consulta 2: número total de vuelos (ventas)."""
+        return pd.DataFrame({'Total_Vuelos': [self._total_ventas()]})
+
+    def distribucion_genero(self):
+        """Consulta 3: distribución por género."""
+        hecho = self.leer_tabla('Hecho_Venta', ['id_pasajero'])
+        dim = self.leer_tabla('Dim_Pasajero', ['id_pasajero', 'passenger_gender'])
+        genero, _ = self.atributo_dimension(hecho, 'id_pasajero', dim, 'passenger_gender')
+
+        df = self.agrupar(genero).rename(columns={'clave': 'Genero'})
+        df['Porcentaje'] = (df['Total'] * 100.0 / self._total_ventas()).round(2)
+        return df.sort_values('Total', ascending=False, kind='stable').reset_index(drop=True)
+
+    def nacionalidades_top(self, top=10):
+        """Consulta 4: nacionalidades más frecuentes."""
+        hecho = self.leer_tabla('Hecho_Venta', ['id_pasajero', 'ticket_price_usd_est'])
+        dim = self.leer_tabla('Dim_Pasajero', ['id_pasajero', 'passenger_nationality'],
+                              filtros=[('passenger_nationality', '!=', 'UNKNOWN')])
+        nacionalidad, mask = self.atributo_dimension(hecho, 'id_pasajero', dim, 'passenger_nationality')
+        precios = hecho['ticket_price_usd_est'].to_numpy(dtype=float)[mask]
+
+        df = self.agrupar(nacionalidad, {'Ingresos_USD': precios}).rename(columns={'clave': 'Nacionalidad'})
+        df['Porcentaje'] = (df['Total'] * 100.0 / self._total_ventas()).round(2)
+        df['Ingresos_USD'] = df['Ingresos_USD'].round(2)
+        df = df.sort_values('Total', ascending=False, kind='stable').head(top)
+        return df[['Nacionalidad', 'Total', 'Porcentaje', 'Ingresos_USD']].reset_index(drop=True)
+
+    def _ingresos_por_dimension(self, id_column, tabla, columna, alias):
+        hecho = self.leer_tabla('Hecho_Venta', [id_column, 'ticket_price_usd_est'])
+        dim = self.leer_tabla(tabla, [id_column, columna])
+        claves, mask = self.atributo_dimension(hecho, id_column, dim, columna)
+        precios = hecho['ticket_price_usd_est'].to_numpy(dtype=float)[mask]
+
+        df = self.agrupar(claves, {'Total_Ingresos_USD': precios}).rename(columns={'clave': alias})
+        df['Precio_Promedio_USD'] = (df['Total_Ingresos_USD'] / df['Total']).round(2)
+        df['Total_Ingresos_USD'] = df['Total_Ingresos_USD'].round(2)
+        return df.sort_values('Total', ascending=False, kind='stable').reset_index(drop=True)
+
+    def canales_venta(self):
+        """Consulta 5: canales de venta más utilizados."""
+        df = self._ingresos_por_dimension('id_canal', 'Dim_CanalVenta', 'sales_channel', 'Canal_Venta')
+        return df.rename(columns={'Total': 'Total_Ventas'})
+
+    def metodos_pago(self):
+        """Consulta 6: métodos de pago más utilizados."""
+        df = self._ingresos_por_dimension('id_metodo_pago', 'Dim_MetodoPago', 'payment_method', 'Metodo_Pago')
+        return df.rename(columns={'Total': 'Total_Transacciones'})
+
+    def rango_edades(self):
+        """Consulta 7: distribución de edad de pasajeros."""
+        hecho = self.leer_tabla('Hecho_Venta', ['id_pasajero', 'ticket_price_usd_est'])
+        dim = self.leer_tabla('Dim_Pasajero', ['id_pasajero', 'passenger_age'],
+                              filtros=[('passenger_age', '>', 0)])
+        edades, mask = self.atributo_dimension(hecho, 'id_pasajero', dim, 'passenger_age')
+        precios = hecho['ticket_price_usd_est'].to_numpy(dtype=float)[mask]
+
+        condiciones = [(edades >= minimo) & (edades <= maximo) for minimo, maximo, _ in RANGOS_EDAD]
+        rangos = np.select(condiciones, [etiqueta for _, _, etiqueta in RANGOS_EDAD], default='60+')
+
+        df = self.agrupar(rangos, {'Precio_Promedio_USD': precios}).rename(columns={'clave': 'Rango_Edad'})
+        df['Precio_Promedio_USD'] = (df['Precio_Promedio_USD'] / df['Total']).round(2)
+        return df.sort_values('Rango_Edad').reset_index(drop=True)
+
+    def analisis_maletas(self):
+        """Consulta 8: total y promedio de maletas y maletas facturadas."""
+        hecho = self.leer_tabla('Hecho_Venta', ['bags_total', 'bags_checked'])
+        return pd.DataFrame({
+            'Metrica': ['Total de Maletas', 'Maletas Facturadas'],
+            'Cantidad': [int(hecho['bags_total'].sum()), int(hecho['bags_checked'].sum())],
+            'Promedio': [round(hecho['bags_total'].mean(), 2), round(hecho['bags_checked'].mean(), 2)]
+        })
+
+    def maletas_facturadas(self):
+        """Ventas con y sin maletas facturadas (gráfico de maletas)."""
+        hecho = self.leer_tabla('Hecho_Venta', ['bags_checked'])
+        categorias = np.where(hecho['bags_checked'].to_numpy() > 0, 'Con Maletas', 'Sin Maletas')
+        return self.agrupar(categorias).rename(columns={'clave': 'Categoria'})
+
+    def nacionalidades_ingresos(self, top=10):
+        """Consulta 9: top nacionalidades por ingresos."""
+        hecho = self.leer_tabla('Hecho_Venta', ['id_pasajero', 'ticket_price_usd_est'])
+        dim = self.leer_tabla('Dim_Pasajero', ['id_pasajero', 'passenger_nationality'],
+                              filtros=[('passenger_nationality', '!=', 'UNKNOWN')])
+        nacionalidad, mask = self.atributo_dimension(hecho, 'id_pasajero', dim, 'passenger_nationality')
+        precios = hecho['ticket_price_usd_est'].to_numpy(dtype=float)[mask]
+
+        df = self.agrupar(nacionalidad, {'Total_Ingresos_USD': precios})
+        df = df.rename(columns={'clave': 'Nacionalidad', 'Total': 'Total_Ventas'})
+        df['Precio_Promedio_USD'] = (df['Total_Ingresos_USD'] / df['Total_Ventas']).round(2)
+        df['Total_Ingresos_USD'] = df['Total_Ingresos_USD'].round(2)
+        df = df.sort_values('Total_Ingresos_USD', ascending=False, kind='stable').head(top)
+        return df.reset_index(drop=True)
+
+    def resumen_ejecutivo(self):
+        """Consulta 10: estadísticas generales del negocio."""
+        hecho = self.leer_tabla('Hecho_Venta', ['id_pasajero', 'ticket_price_usd_est', 'bags_total'])
+        precios = hecho['ticket_price_usd_est'].to_numpy(dtype=float)
+        bags = hecho['bags_total'].to_numpy()
+        return pd.DataFrame({
+            'Pasajeros_Unicos': [hecho['id_pasajero'].nunique()],
+            'Total_Ventas': [len(hecho)],
+            'Ingresos_Totales_USD': [round(precios.sum(), 2)],
+            'Precio_Promedio_USD': [round(precios.mean(), 2) if len(precios) else None],
+            'Precio_Minimo_USD': [round(precios.min(), 2) if len(precios) else None],
+            'Precio_Maximo_USD': [round(precios.max(), 2) if len(precios) else None],
+            'Total_Maletas': [int(bags.sum())],
+            'Promedio_Maletas_Por_Venta': [round(bags.mean(), 2) if len(bags) else None]
+        })
+
+    def ejecutar_todas(self):
+        """Ejecuta todas las consultas y retorna un diccionario nombre -> DataFrame."""
+        consultas = [
+            self.validar_carga, self.total_vuelos, self.distribucion_genero,
+            self.nacionalidades_top, self.canales_venta, self.metodos_pago,
+            self.rango_edades, self.analisis_maletas, self.nacionalidades_ingresos,
+            self.resumen_ejecutivo
+        ]
+        return {consulta.__name__: consulta() for consulta in consultas}
+
+    # ==================== DATOS PARA GRÁFICOS ====================
+    # Mismas columnas que VisualizadorDatos.datos_*, para alimentar figura_* sin SQL Server
+
+    def grafico_distribucion_genero(self):
+        """Datos del gráfico de distribución por género."""
+        return self.distribucion_genero()[['Genero', 'Total']]
+
+    def grafico_canales_venta(self, top=10):
+        """Datos del gráfico de canales de venta (TOP 10 por ventas)."""
+        df = self.canales_venta().head(top)
+        return df.rename(columns={'Canal_Venta': 'Canal', 'Total_Ingresos_USD': 'Ingresos_USD'})[
+            ['Canal', 'Total_Ventas', 'Ingresos_USD']]
+
+    def grafico_metodos_pago(self):
+        """Datos del gráfico de métodos de pago."""
+        df = self.metodos_pago().rename(columns={
+            'Metodo_Pago': 'Metodo', 'Total_Transacciones': 'Total', 'Total_Ingresos_USD': 'Ingresos_USD'
+        })
+        return df[['Metodo', 'Total', 'Ingresos_USD']]
+
+    def grafico_nacionalidades_top(self, top=10):
+        """Datos del gráfico de nacionalidades más frecuentes."""
+        return self.nacionalidades_top(top)[['Nacionalidad', 'Total', 'Ingresos_USD']]
+
+    def grafico_rango_edades(self):
+        """Datos del gráfico de distribución por rango de edad."""
+        return self.rango_edades().rename(columns={'Precio_Promedio_USD': 'Precio_Promedio'})
+
+    def grafico_maletas(self):
+        """Datos del gráfico de análisis de maletas."""
+        return self.maletas_facturadas()
+
+    def grafico_resumen_ejecutivo(self):
+        """Datos del gráfico resumen con KPIs principales."""
+        df = self.resumen_ejecutivo().rename(columns={
+            'Ingresos_Totales_USD': 'Ingresos_USD', 'Precio_Promedio_USD': 'Precio_Promedio'
+        })
+        return df[['Pasajeros_Unicos', 'Total_Ventas', 'Ingresos_USD', 'Precio_Promedio']]
+
+
+if __name__ == "__main__":
+    consultas = ConsultasSnapshot()
+    for nombre, resultado in consultas.ejecutar_todas().items():
+        logger.info(f"\n===== {nombre} =====\n{resultado.to_string(index=False)}")
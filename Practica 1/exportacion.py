@@ -0,0 +1,128 @@
+import datetime
+import decimal
+import logging
+import sys
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Filas por llamada a fetchmany (y por row group al exportar a Parquet)
+FETCH_BATCH_SIZE = 100_000
+
+# Tipo Python reportado por pyodbc en cursor.description -> tipo Arrow
+TIPOS_ARROW = {
+    bool: pa.bool_(),
+    int: pa.int64(),
+    float: pa.float64(),
+    str: pa.string(),
+    bytes: pa.binary(),
+    bytearray: pa.binary(),
+    datetime.datetime: pa.timestamp('us'),
+    datetime.date: pa.date32(),
+    datetime.time: pa.time64('us')
+}
+
+
+class LectorArrow:
+    """Lectura masiva de resultados de SQL Server en lotes columnares de Arrow."""
+
+    def __init__(self, connection, batch_size=None):
+        self.connection = connection
+        self.batch_size = batch_size or FETCH_BATCH_SIZE
+
+    @staticmethod
+    def esquema_desde_cursor(cursor):
+        """Construye el esquema Arrow a partir de cursor.description."""
+        campos = []
+        for nombre, tipo, _, _, precision, escala, _ in cursor.description:
+            if tipo is decimal.Decimal:
+                arrow_type = pa.decimal128(precision or 38, escala or 0)
+            else:
+                arrow_type = TIPOS_ARROW.get(tipo, pa.string())
+            campos.append(pa.field(nombre, arrow_type))
+        return pa.schema(campos)
+
+    def ejecutar(self, query, params=None):
+        """Ejecuta una consulta y retorna el cursor junto con su esquema Arrow."""
+        cursor = self.connection.cursor()
+        cursor.arraysize = self.batch_size
+        if params:
+            cursor.execute(query, params)
+        else:
+            cursor.execute(query)
+        return cursor, self.esquema_desde_cursor(cursor)
+
+    def lotes_desde_cursor(self, cursor, schema):
+        """Genera RecordBatches de hasta batch_size filas desde un cursor abierto."""
+        while True:
+            rows = cursor.fetchmany(self.batch_size)
+            if not rows:
+                break
+            # Transponer filas a columnas y construir arrays tipados directamente
+            columnas = list(zip(*rows))
+            del rows
+            arrays = [pa.array(valores, type=campo.type) for valores, campo in zip(columnas, schema)]
+            yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    def leer_lotes(self, query, params=None):
+        """Ejecuta una consulta y genera RecordBatches de hasta batch_size filas."""
+        cursor, schema = self.ejecutar(query, params)
+        try:
+            yield from self.lotes_desde_cursor(cursor, schema)
+        finally:
+            cursor.close()
+
+    def leer_tabla(self, query, params=None):
+        """Ejecuta una consulta y retorna una tabla Arrow completa."""
+        cursor, schema = self.ejecutar(query, params)
+        try:
+            return pa.Table.from_batches(list(self.lotes_desde_cursor(cursor, schema)), schema=schema)
+        finally:
+            cursor.close()
+
+    def leer_dataframe(self, query, params=None):
+        """Ejecuta una consulta y retorna un DataFrame con columnas numéricas nativas."""
+        table = self.leer_tabla(query, params)
+        # Los DECIMAL se convierten a float64 para operar con NumPy/matplotlib
+        schema = pa.schema([
+            pa.field(f.name, pa.float64()) if pa.types.is_decimal(f.type) else f
+            for f in table.schema
+        ])
+        return table.cast(schema).to_pandas()
+
+    def exportar_parquet(self, query, output_path, params=None, compression='zstd'):
+        """Exporta el resultado de una consulta a Parquet por lotes, con memoria acotada."""
+        cursor, schema = self.ejecutar(query, params)
+        total = 0
+        try:
+            with pq.ParquetWriter(output_path, schema, compression=compression) as writer:
+                for batch in self.lotes_desde_cursor(cursor, schema):
+                    writer.write_batch(batch)
+                    total += batch.num_rows
+                    logger.info(f" {total} registros exportados a {output_path}")
+        finally:
+            cursor.close()
+        return total
+
+
+if __name__ == "__main__":
+    from conexion import get_pool
+
+    output_path = sys.argv[1] if len(sys.argv) > 1 else 'Hecho_Venta.parquet'
+    pool = get_pool()
+    try:
+        connection = pool.obtener()
+    except Exception as e:
+        logger.error(f"Error al conectar: {e}")
+        sys.exit(1)
+    try:
+        lector = LectorArrow(connection)
+        total = lector.exportar_parquet("SELECT * FROM Hecho_Venta", output_path)
+        logger.info(f"Exportación completada: {total} ventas en {output_path}")
+    finally:
+        pool.liberar(connection)
+        pool.cerrar()
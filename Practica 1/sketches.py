@@ -0,0 +1,298 @@
+import os
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Archivo donde el ETL persiste los sketches de KPIs entre cargas (None para desactivarlos)
+SKETCHES_PATH = 'sketches_kpi.npz'
+
+# HyperLogLog: 2^14 registros -> error estándar 1.04 / sqrt(16384) ≈ 0.81 %
+HLL_PRECISION = 14
+# t-digest: compresión 200 -> error de rango típico < 0.5 % (mucho menor en las colas)
+TDIGEST_COMPRESSION = 200
+# Count-min: sobreestimación <= CMS_EPSILON * N con probabilidad 1 - CMS_DELTA
+CMS_EPSILON = 0.001
+CMS_DELTA = 0.01
+# Claves candidatas que se conservan para responder el top de nacionalidades
+CMS_CANDIDATOS = 100
+
+
+def hash64(values):
+    """Hash estable de 64 bits (idéntico entre ejecuciones) para un arreglo de valores."""
+    return pd.util.hash_array(np.asarray(values, dtype=object))
+
+
+class HyperLogLog:
+    """Conteo aproximado de valores distintos (equivale a COUNT(DISTINCT ...))."""
+
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = registers if registers is not None else np.zeros(self.m, dtype=np.uint8)
+
+    def update(self, values):
+        """Agrega un lote de valores al sketch."""
+        if len(values) == 0:
+            return
+        h = hash64(values)
+        idx = (h >> np.uint64(64 - self.precision)).astype(np.int64)
+        bits = 64 - self.precision
+        w = h & np.uint64((1 << bits) - 1)
+        # w < 2^53, así que frexp da la longitud en bits exacta
+        _, bit_length = np.frexp(w.astype(np.float64))
+        rank = (bits - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rank)
+
+    def merge(self, other):
+        """Combina otro sketch con la misma precisión."""
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        """Estimación de la cardinalidad."""
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m ** 2 / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * self.m and zeros:
+            # Corrección para rangos pequeños (linear counting)
+            estimate = self.m * np.log(self.m / zeros)
+        return int(round(estimate))
+
+    @property
+    def relative_error(self):
+        return 1.04 / np.sqrt(self.m)
+
+
+class TDigest:
+    """Percentiles aproximados mediante centroides fusionables (merging t-digest)."""
+
+    def __init__(self, compression=TDIGEST_COMPRESSION, means=None, weights=None):
+        self.compression = compression
+        self.means = means if means is not None else np.empty(0, dtype=np.float64)
+        self.weights = weights if weights is not None else np.empty(0, dtype=np.float64)
+
+    def _k(self, q):
+        # Función de escala k1: centroides pequeños en las colas, grandes en el centro
+        return self.compression / (2 * np.pi) * np.arcsin(2 * np.clip(q, 0, 1) - 1)
+
+    def _compress(self, means, weights):
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        q_left = (np.cumsum(weights) - weights) / total
+        # Cada centroide resultante abarca a lo sumo una unidad de la escala k
+        cluster = np.floor(self._k(q_left) - self._k(0)).astype(np.int64)
+        cluster = np.maximum.accumulate(cluster)
+        _, cluster = np.unique(cluster, return_inverse=True)
+        new_weights = np.bincount(cluster, weights=weights)
+        new_means = np.bincount(cluster, weights=means * weights) / new_weights
+        return new_means, new_weights
+
+    def update(self, values):
+        """Agrega un lote de valores al digest."""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.means, self.weights = self._compress(
+            np.concatenate([self.means, values]),
+            np.concatenate([self.weights, np.ones(len(values))])
+        )
+
+    def merge(self, other):
+        """Combina otro digest."""
+        if len(other.means) == 0:
+            return
+        self.means, self.weights = self._compress(
+            np.concatenate([self.means, other.means]),
+            np.concatenate([self.weights, other.weights])
+        )
+
+    def quantile(self, q):
+        """Valor aproximado del cuantil q (0 <= q <= 1)."""
+        if len(self.means) == 0:
+            return None
+        centers = (np.cumsum(self.weights) - self.weights / 2) / self.weights.sum()
+        return float(np.interp(q, centers, self.means))
+
+
+class CountMinSketch:
+    """Frecuencias aproximadas con una lista de candidatos para el top-k."""
+
+    def __init__(self, epsilon=CMS_EPSILON, delta=CMS_DELTA, table=None, candidates=None):
+        self.width = int(np.ceil(np.e / epsilon))
+        self.depth = int(np.ceil(np.log(1 / delta)))
+        self.epsilon = epsilon
+        self.table = table if table is not None else np.zeros((self.depth, self.width), dtype=np.int64)
+        self.candidates = candidates if candidates is not None else np.empty(0, dtype=str)
+
+    def _columns(self, keys):
+        # Doble hashing (Kirsch-Mitzenmacher): fila i usa h1 + i * h2
+        h = hash64(keys)
+        h1 = (h & np.uint64(0xFFFFFFFF)).astype(np.int64)
+        h2 = (h >> np.uint64(32)).astype(np.int64) | 1
+        rows = np.arange(self.depth, dtype=np.int64)[:, None]
+        return (h1[None, :] + rows * h2[None, :]) % self.width
+
+    def update(self, keys):
+        """Agrega un lote de claves al sketch."""
+        counts = pd.Series(keys).value_counts()
+        if counts.empty:
+            return
+        keys = counts.index.astype(str).to_numpy(dtype=str)
+        cols = self._columns(keys)
+        for row in range(self.depth):
+            np.add.at(self.table[row], cols[row], counts.to_numpy())
+        self._refresh_candidates(keys[:CMS_CANDIDATOS])
+
+    def merge(self, other):
+        """Combina otro sketch con las mismas dimensiones."""
+        self.table += other.table
+        self._refresh_candidates(other.candidates)
+
+    def _refresh_candidates(self, keys):
+        candidates = np.unique(np.concatenate([self.candidates.astype(str), np.asarray(keys, dtype=str)]))
+        estimates = self.estimate(candidates)
+        order = np.argsort(-estimates, kind='stable')[:CMS_CANDIDATOS]
+        self.candidates = candidates[order]
+
+    def estimate(self, keys):
+        """Frecuencia estimada (cota superior) de cada clave."""
+        if len(keys) == 0:
+            return np.empty(0, dtype=np.int64)
+        cols = self._columns(keys)
+        return self.table[np.arange(self.depth)[:, None], cols].min(axis=0)
+
+    def top(self, k, exclude=()):
+        """Las k claves candidatas con mayor frecuencia estimada."""
+        keys = np.array([c for c in self.candidates if c not in exclude], dtype=str)
+        estimates = self.estimate(keys)
+        order = np.argsort(-estimates, kind='stable')[:k]
+        return pd.DataFrame({'clave': keys[order], 'Total': estimates[order]})
+
+
+class SketchesKPI:
+    """Sketches de los KPIs del resumen ejecutivo, actualizados por lote de carga."""
+
+    def __init__(self):
+        self.pasajeros = HyperLogLog()
+        self.precios = TDigest()
+        self.nacionalidades = CountMinSketch()
+        # Agregados exactos (también fusionables)
+        self.total_ventas = 0
+        self.ingresos = 0.0
+        self.precio_min = np.inf
+        self.precio_max = -np.inf
+        self.total_maletas = 0
+
+    def update(self, df):
+        """Actualiza los sketches con un lote de ventas transformadas."""
+        precios = df['ticket_price_usd_est'].to_numpy(dtype=np.float64)
+        self.pasajeros.update(df['passenger_id'].to_numpy())
+        self.precios.update(precios)
+        self.nacionalidades.update(df['passenger_nationality'].to_numpy())
+        self.total_ventas += len(df)
+        if len(precios):
+            self.ingresos += float(precios.sum())
+            self.precio_min = min(self.precio_min, float(precios.min()))
+            self.precio_max = max(self.precio_max, float(precios.max()))
+        self.total_maletas += int(df['bags_total'].sum())
+
+    def merge(self, other):
+        """Combina los sketches de otro lote o proceso."""
+        self.pasajeros.merge(other.pasajeros)
+        self.precios.merge(other.precios)
+        self.nacionalidades.merge(other.nacionalidades)
+        self.total_ventas += other.total_ventas
+        self.ingresos += other.ingresos
+        self.precio_min = min(self.precio_min, other.precio_min)
+        self.precio_max = max(self.precio_max, other.precio_max)
+        self.total_maletas += other.total_maletas
+
+    def save(self, path=None):
+        """Persiste los sketches en un archivo .npz.
+
+        Se escribe un archivo temporal y se reemplaza el anterior al final, así que
+        una caída durante la escritura no deja un archivo corrupto.
+        """
+        path = path or SKETCHES_PATH
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(
+                f,
+                hll_registers=self.pasajeros.registers,
+                tdigest_means=self.precios.means,
+                tdigest_weights=self.precios.weights,
+                cms_table=self.nacionalidades.table,
+                cms_candidates=self.nacionalidades.candidates.astype(str),
+                exactos=np.array([self.total_ventas, self.ingresos, self.precio_min,
+                                  self.precio_max, self.total_maletas], dtype=np.float64)
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    @staticmethod
+    def load(path=None):
+        """Carga los sketches persistidos; retorna sketches vacíos si no existen."""
+        path = path or SKETCHES_PATH
+        sketches = SketchesKPI()
+        if not os.path.exists(path):
+            return sketches
+        with np.load(path) as data:
+            sketches.pasajeros.registers = data['hll_registers']
+            sketches.precios.means = data['tdigest_means']
+            sketches.precios.weights = data['tdigest_weights']
+            sketches.nacionalidades.table = data['cms_table']
+            sketches.nacionalidades.candidates = data['cms_candidates']
+            total, ingresos, precio_min, precio_max, maletas = data['exactos']
+        sketches.total_ventas = int(total)
+        sketches.ingresos = float(ingresos)
+        sketches.precio_min = float(precio_min)
+        sketches.precio_max = float(precio_max)
+        sketches.total_maletas = int(maletas)
+        return sketches
+
+    def resumen_ejecutivo(self):
+        """Equivalente aproximado de la consulta 10 (pasajeros únicos por HyperLogLog)."""
+        total = self.total_ventas
+        return pd.DataFrame({
+            # El estimador puede superar el total exacto de ventas, que es su cota superior
+            'Pasajeros_Unicos': [min(self.pasajeros.estimate(), total)],
+            'Total_Ventas': [total],
+            'Ingresos_Totales_USD': [round(self.ingresos, 2)],
+            'Precio_Promedio_USD': [round(self.ingresos / total, 2) if total else None],
+            'Precio_Minimo_USD': [round(self.precio_min, 2) if total else None],
+            'Precio_Maximo_USD': [round(self.precio_max, 2) if total else None],
+            'Precio_P50_USD': [self.precios.quantile(0.5)],
+            'Precio_P90_USD': [self.precios.quantile(0.9)],
+            'Precio_P99_USD': [self.precios.quantile(0.99)],
+            'Total_Maletas': [self.total_maletas],
+            'Promedio_Maletas_Por_Venta': [round(self.total_maletas / total, 2) if total else None]
+        })
+
+    def nacionalidades_top(self, top=10):
+        """Top de nacionalidades por cantidad de ventas (count-min, cota superior)."""
+        df = self.nacionalidades.top(top, exclude=('UNKNOWN',))
+        return df.rename(columns={'clave': 'Nacionalidad'})
+
+    def cotas_error(self):
+        """Cotas de error documentadas para cada sketch."""
+        return {
+            'Pasajeros_Unicos': f"±{self.pasajeros.relative_error:.2%} (error estándar HyperLogLog)",
+            'Percentiles': f"error de rango típico < {1 / self.precios.compression:.1%} (t-digest, menor en colas)",
+            'Nacionalidades': (f"sobreestimación <= {self.nacionalidades.epsilon:.1%} del total "
+                               f"({int(self.nacionalidades.epsilon * self.total_ventas)} ventas) "
+                               f"con probabilidad {1 - CMS_DELTA:.0%}")
+        }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sketches = SketchesKPI.load()
+    logger.info(f"\n{sketches.resumen_ejecutivo().T.to_string(header=False)}")
+    logger.info(f"\n{sketches.nacionalidades_top().to_string(index=False)}")
+    for kpi, cota in sketches.cotas_error().items():
+        logger.info(f" {kpi}: {cota}")
@@ -1,68 +1,328 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import pyodbc
+import base64
 import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+matplotlib.use('Agg')
+import seaborn as sns
+from matplotlib import cm
+from matplotlib.artist import setp
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.figure import Figure
+
+from conexion import get_pool, con_reintentos
+from consultas_analisis import ConsultasSnapshot
+from exportacion import LectorArrow
+from sketches import SketchesKPI, SKETCHES_PATH
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Configuración de conexión SQL Server
-DATABASE_CONFIG = {
-    'Server': 'localhost,1433',
-    'Database': 'Semi2_P1',
-    'UID': 'sa',
-    'PWD': 'PasswordSegura123!',
-    'Driver': '{ODBC Driver 18 for SQL Server}'
-}
+# Modo aproximado: KPIs y top de nacionalidades desde los sketches persistidos por el ETL
+KPI_APROXIMADO = False
+# Fuente sin conexión: directorio del snapshot Parquet del ETL (None = consultar SQL Server)
+SNAPSHOT_DIR = None
 
-# Estilo de gráficos
+# Renderizado: resolución, formato de salida ('png', 'svg', 'pdf', ...) y procesos en paralelo
+DPI = 300
+FORMATO = 'png'
+OUTPUT_DIR = '.'
+PROCESOS = None  # None = un proceso por gráfico, hasta la cantidad de CPUs
+# Reporte único con todos los gráficos: None, 'pdf' (multipágina) o 'html'
+REPORTE = None
+
+# Estilo de gráficos (se aplica también en cada proceso de renderizado al importar el módulo)
 sns.set_style("whitegrid")
-plt.rcParams['figure.figsize'] = (12, 6)
-plt.rcParams['font.size'] = 10
+matplotlib.rcParams['figure.figsize'] = (12, 6)
+matplotlib.rcParams['font.size'] = 10
+
+
+# ==================== FIGURAS ====================
+# Cada función construye la figura a partir de datos ya calculados, con la API
+# orientada a objetos (sin el estado global de pyplot), para poder renderizarla
+# en cualquier proceso.
+
+
+def figura_distribucion_genero(df):
+    """Gráfico de distribución por género."""
+    fig = Figure(figsize=(8, 5))
+    ax = fig.subplots()
+    colores = {'M': '#3498db', 'F': '#e74c3c', 'X': '#95a5a6'}
+    colors = [colores.get(g, '#34495e') for g in df['Genero']]
+
+    bars = ax.bar(df['Genero'], df['Total'], color=colors, edgecolor='black', linewidth=1.5)
+    ax.set_xlabel('Género', fontsize=12, fontweight='bold')
+    ax.set_ylabel('Cantidad de Vuelos', fontsize=12, fontweight='bold')
+    ax.set_title('Distribución de Pasajeros por Género', fontsize=14, fontweight='bold')
+
+    # Añadir etiquetas en las barras
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height,
+               f'{int(height)}', ha='center', va='bottom', fontweight='bold')
+
+    fig.tight_layout()
+    return fig
+
+
+def figura_canales_venta(df):
+    """Gráfico de canales de venta."""
+    fig = Figure(figsize=(14, 5))
+    ax1, ax2 = fig.subplots(1, 2)
+
+    # Gráfico de cantidad
+    ax1.barh(df['Canal'], df['Total_Ventas'], color='#3498db', edgecolor='black')
+    ax1.set_xlabel('Total de Ventas', fontsize=11, fontweight='bold')
+    ax1.set_title('Cantidad de Ventas por Canal', fontsize=12, fontweight='bold')
+    ax1.invert_yaxis()
+
+    # Gráfico de ingresos
+    ax2.barh(df['Canal'], df['Ingresos_USD'], color='#2ecc71', edgecolor='black')
+    ax2.set_xlabel('Ingresos (USD)', fontsize=11, fontweight='bold')
+    ax2.set_title('Ingresos por Canal de Venta', fontsize=12, fontweight='bold')
+    ax2.invert_yaxis()
+
+    fig.tight_layout()
+    return fig
+
+
+def figura_metodos_pago(df):
+    """Gráfico de métodos de pago."""
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+
+    colors_pie = cm.Set3(range(len(df)))
+    wedges, texts, autotexts = ax.pie(df['Total'], labels=df['Metodo'], autopct='%1.1f%%',
+                                       colors=colors_pie, startangle=90, textprops={'fontsize': 10})
+
+    for autotext in autotexts:
+        autotext.set_color('black')
+        autotext.set_fontweight('bold')
+
+    ax.set_title('Distribución de Métodos de Pago', fontsize=14, fontweight='bold')
+    fig.tight_layout()
+    return fig
+
+
+def figura_nacionalidades_top(df):
+    """Gráfico de nacionalidades más frecuentes."""
+    fig = Figure(figsize=(12, 6))
+    ax = fig.subplots()
+
+    ax.bar(df['Nacionalidad'], df['Total'], color='#9b59b6', edgecolor='black', linewidth=1.2)
+    ax.set_xlabel('Nacionalidad', fontsize=11, fontweight='bold')
+    ax.set_ylabel('Total de Vuelos', fontsize=11, fontweight='bold')
+    ax.set_title('Top 10 Nacionalidades por Cantidad de Vuelos', fontsize=13, fontweight='bold')
+    setp(ax.get_xticklabels(), rotation=45, ha='right')
+    fig.tight_layout()
+    return fig
+
+
+def figura_rango_edades(df):
+    """Gráfico de distribución por rango de edad."""
+    fig = Figure(figsize=(14, 5))
+    ax1, ax2 = fig.subplots(1, 2)
+
+    # Cantidad por rango
+    ax1.bar(df['Rango_Edad'], df['Total'], color='#e67e22', edgecolor='black', linewidth=1.2)
+    ax1.set_xlabel('Rango de Edad', fontsize=11, fontweight='bold')
+    ax1.set_ylabel('Cantidad de Vuelos', fontsize=11, fontweight='bold')
+    ax1.set_title('Pasajeros por Rango de Edad', fontsize=12, fontweight='bold')
+    setp(ax1.xaxis.get_majorticklabels(), rotation=45)
+
+    # Precio promedio por rango
+    ax2.plot(df['Rango_Edad'], df['Precio_Promedio'], marker='o', linewidth=2.5, 
+            markersize=8, color='#1abc9c')
+    ax2.fill_between(range(len(df)), df['Precio_Promedio'], alpha=0.3, color='#1abc9c')
+    ax2.set_xlabel('Rango de Edad', fontsize=11, fontweight='bold')
+    ax2.set_ylabel('Precio Promedio (USD)', fontsize=11, fontweight='bold')
+    ax2.set_title('Precio Promedio por Rango de Edad', fontsize=12, fontweight='bold')
+    setp(ax2.xaxis.get_majorticklabels(), rotation=45)
+
+    fig.tight_layout()
+    return fig
+
+
+def figura_maletas(df):
+    """Gráfico de análisis de maletas."""
+    fig = Figure(figsize=(14, 5))
+    ax1, ax2 = fig.subplots(1, 2)
+
+    # Pie chart
+    colors = ['#e74c3c' if cat == 'Con Maletas' else '#3498db' for cat in df['Categoria']]
+    wedges, texts, autotexts = ax1.pie(df['Total'], labels=df['Categoria'], autopct='%1.1f%%',
+                                       colors=colors, startangle=90, textprops={'fontsize': 11})
+    for autotext in autotexts:
+        autotext.set_color('white')
+        autotext.set_fontweight('bold')
+    ax1.set_title('Pasajeros Con/Sin Maletas Facturadas', fontsize=12, fontweight='bold')
+
+    # Bar chart
+    ax2.bar(df['Categoria'], df['Total'], color=colors, edgecolor='black', linewidth=1.5)
+    ax2.set_ylabel('Cantidad de Pasajeros', fontsize=11, fontweight='bold')
+    ax2.set_title('Distribución de Maletas Facturadas', fontsize=12, fontweight='bold')
+
+    fig.tight_layout()
+    return fig
+
+
+def figura_resumen_ejecutivo(df):
+    """Gráfico resumen con KPIs principales."""
+    fig = Figure(figsize=(12, 6))
+    ax = fig.add_subplot(111)
+    ax.axis('off')
+
+    # Datos
+    metrics = [
+        f"Pasajeros Únicos: {'≈' if 'Aproximado' in df else ''}{int(df.iloc[0]['Pasajeros_Unicos'])}",
+        f"Total de Ventas: {int(df.iloc[0]['Total_Ventas'])}",
+        f"Ingresos Totales: ${df.iloc[0]['Ingresos_USD']:,.2f}",
+        f"Precio Promedio: ${df.iloc[0]['Precio_Promedio']:,.2f}"
+    ]
+
+    y_pos = 0.9
+    for i, metric in enumerate(metrics):
+        color = ['#3498db', '#2ecc71', '#e74c3c', '#f39c12'][i]
+        ax.text(0.5, y_pos, metric, fontsize=18, fontweight='bold',
+               ha='center', bbox=dict(boxstyle='round', facecolor=color, alpha=0.3))
+        y_pos -= 0.2
+
+    ax.set_title('Resumen Ejecutivo - KPIs Principales', fontsize=16, fontweight='bold', pad=20)
+    fig.tight_layout()
+    return fig
+
+
+# Nombre -> (función de figura, archivo de salida sin extensión, descripción)
+GRAFICOS = {
+    'distribucion_genero': (figura_distribucion_genero, '01_distribucion_genero', 'Distribución por género'),
+    'canales_venta': (figura_canales_venta, '02_canales_venta', 'Canales de venta'),
+    'metodos_pago': (figura_metodos_pago, '03_metodos_pago', 'Métodos de pago'),
+    'nacionalidades_top': (figura_nacionalidades_top, '04_nacionalidades_top', 'Nacionalidades top 10'),
+    'rango_edades': (figura_rango_edades, '05_rango_edades', 'Rango de edades'),
+    'maletas': (figura_maletas, '07_analisis_maletas', 'Análisis de maletas'),
+    'resumen_ejecutivo': (figura_resumen_ejecutivo, '08_resumen_ejecutivo', 'Resumen ejecutivo')
+}
+
+
+def renderizar_grafico(nombre, df, dpi=DPI, formato=FORMATO, output_dir=OUTPUT_DIR):
+    """Construye y guarda un gráfico; la figura se libera al terminar. Retorna la ruta."""
+    construir, archivo, _ = GRAFICOS[nombre]
+    fig = construir(df)
+    path = os.path.join(output_dir, f"{archivo}.{formato}")
+    try:
+        fig.savefig(path, dpi=dpi, bbox_inches='tight', format=formato)
+    finally:
+        fig.clear()
+    return path
+
+
+def generar_reporte_pdf(datos, path):
+    """Escribe todos los gráficos como un PDF multipágina (vectorial)."""
+    with PdfPages(path) as pdf:
+        for nombre, df in datos.items():
+            fig = GRAFICOS[nombre][0](df)
+            try:
+                pdf.savefig(fig, bbox_inches='tight')
+            finally:
+                fig.clear()
+    return path
+
+
+def generar_reporte_html(rutas, path):
+    """Escribe un HTML autocontenido con los gráficos ya renderizados embebidos."""
+    tipos = {'png': 'image/png', 'jpg': 'image/jpeg', 'jpeg': 'image/jpeg', 'svg': 'image/svg+xml'}
+    secciones = []
+    for nombre, ruta in rutas.items():
+        extension = ruta.rsplit('.', 1)[-1].lower()
+        if extension not in tipos:
+            logger.warning(f"Formato {extension} no se puede embeber en HTML, omitiendo {ruta}")
+            continue
+        with open(ruta, 'rb') as f:
+            contenido = base64.b64encode(f.read()).decode('ascii')
+        secciones.append(
+            f'<section><h2>{GRAFICOS[nombre][2]}</h2>'
+            f'<img src="data:{tipos[extension]};base64,{contenido}" style="max-width:100%"></section>'
+        )
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<!DOCTYPE html><html><head><meta charset="utf-8">'
+                '<title>Reporte de Ventas de Boletos</title></head><body>'
+                '<h1>Reporte de Ventas de Boletos</h1>' + ''.join(secciones) + '</body></html>')
+    return path
 
 
 class VisualizadorDatos:
-    def __init__(self):
+    def __init__(self, aproximado=None, dpi=None, formato=None, output_dir=None, snapshot_dir=None):
         self.connection = None
-        self.connect()
+        self.aproximado = KPI_APROXIMADO if aproximado is None else aproximado
+        self.dpi = dpi or DPI
+        self.formato = formato or FORMATO
+        self.output_dir = output_dir or OUTPUT_DIR
+        snapshot_dir = snapshot_dir or SNAPSHOT_DIR
+        self.consultas = ConsultasSnapshot(snapshot_dir) if snapshot_dir else None
+        if self.consultas is None:
+            self.connect()
     
     def connect(self):
-        """Establece conexión con SQL Server."""
+        """Obtiene una conexión del pool compartido de SQL Server."""
         try:
-            connection_string = (
-                f"Driver={DATABASE_CONFIG['Driver']};"
-                f"Server={DATABASE_CONFIG['Server']};"
-                f"Database={DATABASE_CONFIG['Database']};"
-                f"UID={DATABASE_CONFIG['UID']};"
-                f"PWD={DATABASE_CONFIG['PWD']};"
-                f"Encrypt=yes;"
-                f"TrustServerCertificate=yes"
-            )
-            self.connection = pyodbc.connect(connection_string)
+            self.connection = get_pool().obtener()
             logger.info(" Conectado a SQL Server para visualización")
         except Exception as e:
             logger.error(f"Error al conectar: {e}")
             self.connection = None
     
+    def reconnect(self):
+        """Descarta la conexión actual (caída) y obtiene otra del pool."""
+        if self.connection is not None:
+            get_pool().descartar(self.connection)
+        self.connection = get_pool().obtener()
+    
     def ejecutar_query(self, query):
         """Ejecuta una consulta y retorna un DataFrame."""
         try:
-            df = pd.read_sql(query, self.connection)
+            # Lectura por lotes con fetchmany directamente a columnas Arrow tipadas;
+            # ante errores transitorios se reconecta y se repite la consulta
+            df = con_reintentos(lambda: LectorArrow(self.connection).leer_dataframe(query),
+                                al_fallar=self.reconnect)
             return df
         except Exception as e:
             logger.error(f"Error ejecutando query: {e}")
             return None
     
+    def consultar(self, nombre, query):
+        """Datos de un gráfico desde el snapshot Parquet si está configurado, o desde SQL Server."""
+        if self.consultas is None:
+            return self.ejecutar_query(query)
+        try:
+            return getattr(self.consultas, f"grafico_{nombre}")()
+        except Exception as e:
+            logger.error(f"Error leyendo el snapshot: {e}")
+            return None
+    
+    def cargar_sketches(self):
+        """Retorna los sketches de KPIs si el modo aproximado está activo y existen."""
+        if not self.aproximado:
+            return None
+        if not SKETCHES_PATH or not os.path.exists(SKETCHES_PATH):
+            logger.warning(f"No existe {SKETCHES_PATH}, usando consultas exactas")
+            return None
+        try:
+            return SketchesKPI.load(SKETCHES_PATH)
+        except Exception as e:
+            logger.warning(f"No se pudo leer {SKETCHES_PATH} ({e}), usando consultas exactas")
+            return None
+    
     def close(self):
-        """Cierra la conexión."""
+        """Devuelve la conexión al pool."""
         if self.connection:
-            self.connection.close()
+            get_pool().liberar(self.connection)
+            self.connection = None
             logger.info("Conexión cerrada")
     
-    def graficar_distribucion_genero(self):
-        """Gráfico de distribución por género."""
+    def datos_distribucion_genero(self):
+        """Datos para el gráfico de distribución por género."""
         query = """
         SELECT 
             dp.passenger_gender AS Genero,
@@ -71,30 +331,11 @@ class VisualizadorDatos:
         INNER JOIN Dim_Pasajero dp ON hv.id_pasajero = dp.id_pasajero
         GROUP BY dp.passenger_gender
         """
-        df = self.ejecutar_query(query)
-        
-        if df is not None and not df.empty:
-            fig, ax = plt.subplots(figsize=(8, 5))
-            colores = {'M': '#3498db', 'F': '#e74c3c', 'X': '#95a5a6'}
-            colors = [colores.get(g, '#34495e') for g in df['Genero']]
-            
-            bars = ax.bar(df['Genero'], df['Total'], color=colors, edgecolor='black', linewidth=1.5)
-            ax.set_xlabel('Género', fontsize=12, fontweight='bold')
-            ax.set_ylabel('Cantidad de Vuelos', fontsize=12, fontweight='bold')
-            ax.set_title('Distribución de Pasajeros por Género', fontsize=14, fontweight='bold')
-            
-            # Añadir etiquetas en las barras
-            for bar in bars:
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2., height,
-                       f'{int(height)}', ha='center', va='bottom', fontweight='bold')
-            
-            plt.tight_layout()
-            plt.savefig('01_distribucion_genero.png', dpi=300, bbox_inches='tight')
-            logger.info(" Gráfico: Distribución por género")
+        df = self.consultar('distribucion_genero', query)
+        return df
     
-    def graficar_canales_venta(self):
-        """Gráfico de canales de venta."""
+    def datos_canales_venta(self):
+        """Datos para el gráfico de canales de venta."""
         query = """
         SELECT TOP 10
             dcv.sales_channel AS Canal,
@@ -105,29 +346,11 @@ class VisualizadorDatos:
         GROUP BY dcv.sales_channel
         ORDER BY Total_Ventas DESC
         """
-        df = self.ejecutar_query(query)
-        
-        if df is not None and not df.empty:
-            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 5))
-            
-            # Gráfico de cantidad
-            ax1.barh(df['Canal'], df['Total_Ventas'], color='#3498db', edgecolor='black')
-            ax1.set_xlabel('Total de Ventas', fontsize=11, fontweight='bold')
-            ax1.set_title('Cantidad de Ventas por Canal', fontsize=12, fontweight='bold')
-            ax1.invert_yaxis()
-            
-            # Gráfico de ingresos
-            ax2.barh(df['Canal'], df['Ingresos_USD'], color='#2ecc71', edgecolor='black')
-            ax2.set_xlabel('Ingresos (USD)', fontsize=11, fontweight='bold')
-            ax2.set_title('Ingresos por Canal de Venta', fontsize=12, fontweight='bold')
-            ax2.invert_yaxis()
-            
-            plt.tight_layout()
-            plt.savefig('02_canales_venta.png', dpi=300, bbox_inches='tight')
-            logger.info(" Gráfico: Canales de venta")
+        df = self.consultar('canales_venta', query)
+        return df
     
-    def graficar_metodos_pago(self):
-        """Gráfico de métodos de pago."""
+    def datos_metodos_pago(self):
+        """Datos para el gráfico de métodos de pago."""
         query = """
         SELECT 
             dmp.payment_method AS Metodo,
@@ -138,26 +361,11 @@ class VisualizadorDatos:
         GROUP BY dmp.payment_method
         ORDER BY Total DESC
         """
-        df = self.ejecutar_query(query)
-        
-        if df is not None and not df.empty:
-            fig, ax = plt.subplots(figsize=(10, 6))
-            
-            colors_pie = plt.cm.Set3(range(len(df)))
-            wedges, texts, autotexts = ax.pie(df['Total'], labels=df['Metodo'], autopct='%1.1f%%',
-                                               colors=colors_pie, startangle=90, textprops={'fontsize': 10})
-            
-            for autotext in autotexts:
-                autotext.set_color('black')
-                autotext.set_fontweight('bold')
-            
-            ax.set_title('Distribución de Métodos de Pago', fontsize=14, fontweight='bold')
-            plt.tight_layout()
-            plt.savefig('03_metodos_pago.png', dpi=300, bbox_inches='tight')
-            logger.info(" Gráfico: Métodos de pago")
+        df = self.consultar('metodos_pago', query)
+        return df
     
-    def graficar_nacionalidades_top(self):
-        """Gráfico de nacionalidades más frecuentes."""
+    def datos_nacionalidades_top(self):
+        """Datos para el gráfico de nacionalidades más frecuentes."""
         query = """
         SELECT TOP 10
             dp.passenger_nationality AS Nacionalidad,
@@ -169,22 +377,16 @@ class VisualizadorDatos:
         GROUP BY dp.passenger_nationality
         ORDER BY Total DESC
         """
-        df = self.ejecutar_query(query)
-        
-        if df is not None and not df.empty:
-            fig, ax = plt.subplots(figsize=(12, 6))
-            
-            ax.bar(df['Nacionalidad'], df['Total'], color='#9b59b6', edgecolor='black', linewidth=1.2)
-            ax.set_xlabel('Nacionalidad', fontsize=11, fontweight='bold')
-            ax.set_ylabel('Total de Vuelos', fontsize=11, fontweight='bold')
-            ax.set_title('Top 10 Nacionalidades por Cantidad de Vuelos', fontsize=13, fontweight='bold')
-            plt.xticks(rotation=45, ha='right')
-            plt.tight_layout()
-            plt.savefig('04_nacionalidades_top.png', dpi=300, bbox_inches='tight')
-            logger.info(" Gráfico: Nacionalidades top 10")
+        sketches = self.cargar_sketches()
+        if sketches is not None:
+            # Count-min: cada total es una cota superior del valor exacto
+            df = sketches.nacionalidades_top(10)
+        else:
+            df = self.consultar('nacionalidades_top', query)
+        return df
     
-    def graficar_rango_edades(self):
-        """Gráfico de distribución por rango de edad."""
+    def datos_rango_edades(self):
+        """Datos para el gráfico de distribución por rango de edad."""
         query = """
         SELECT 
             CASE 
@@ -209,33 +411,11 @@ class VisualizadorDatos:
             END
         ORDER BY Rango_Edad
         """
-        df = self.ejecutar_query(query)
-        
-        if df is not None and not df.empty:
-            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 5))
-            
-            # Cantidad por rango
-            ax1.bar(df['Rango_Edad'], df['Total'], color='#e67e22', edgecolor='black', linewidth=1.2)
-            ax1.set_xlabel('Rango de Edad', fontsize=11, fontweight='bold')
-            ax1.set_ylabel('Cantidad de Vuelos', fontsize=11, fontweight='bold')
-            ax1.set_title('Pasajeros por Rango de Edad', fontsize=12, fontweight='bold')
-            plt.setp(ax1.xaxis.get_majorticklabels(), rotation=45)
-            
-            # Precio promedio por rango
-            ax2.plot(df['Rango_Edad'], df['Precio_Promedio'], marker='o', linewidth=2.5, 
-                    markersize=8, color='#1abc9c')
-            ax2.fill_between(range(len(df)), df['Precio_Promedio'], alpha=0.3, color='#1abc9c')
-            ax2.set_xlabel('Rango de Edad', fontsize=11, fontweight='bold')
-            ax2.set_ylabel('Precio Promedio (USD)', fontsize=11, fontweight='bold')
-            ax2.set_title('Precio Promedio por Rango de Edad', fontsize=12, fontweight='bold')
-            plt.setp(ax2.xaxis.get_majorticklabels(), rotation=45)
-            
-            plt.tight_layout()
-            plt.savefig('05_rango_edades.png', dpi=300, bbox_inches='tight')
-            logger.info(" Gráfico: Rango de edades")
+        df = self.consultar('rango_edades', query)
+        return df
     
-    def graficar_maletas(self):
-        """Gráfico de análisis de maletas."""
+    def datos_maletas(self):
+        """Datos para el gráfico de análisis de maletas."""
         query = """
         SELECT 
             CASE WHEN bags_checked > 0 THEN 'Con Maletas' ELSE 'Sin Maletas' END AS Categoria,
@@ -243,31 +423,11 @@ class VisualizadorDatos:
         FROM Hecho_Venta
         GROUP BY CASE WHEN bags_checked > 0 THEN 'Con Maletas' ELSE 'Sin Maletas' END
         """
-        df = self.ejecutar_query(query)
-        
-        if df is not None and not df.empty:
-            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 5))
-            
-            # Pie chart
-            colors = ['#e74c3c' if cat == 'Con Maletas' else '#3498db' for cat in df['Categoria']]
-            wedges, texts, autotexts = ax1.pie(df['Total'], labels=df['Categoria'], autopct='%1.1f%%',
-                                               colors=colors, startangle=90, textprops={'fontsize': 11})
-            for autotext in autotexts:
-                autotext.set_color('white')
-                autotext.set_fontweight('bold')
-            ax1.set_title('Pasajeros Con/Sin Maletas Facturadas', fontsize=12, fontweight='bold')
-            
-            # Bar chart
-            ax2.bar(df['Categoria'], df['Total'], color=colors, edgecolor='black', linewidth=1.5)
-            ax2.set_ylabel('Cantidad de Pasajeros', fontsize=11, fontweight='bold')
-            ax2.set_title('Distribución de Maletas Facturadas', fontsize=12, fontweight='bold')
-            
-            plt.tight_layout()
-            plt.savefig('07_analisis_maletas.png', dpi=300, bbox_inches='tight')
-            logger.info(" Gráfico: Análisis de maletas")
+        df = self.consultar('maletas', query)
+        return df
     
-    def graficar_resumen_ejecutivo(self):
-        """Gráfico resumen con KPIs principales."""
+    def datos_resumen_ejecutivo(self):
+        """Datos para el gráfico resumen con KPIs principales."""
         query = """
         SELECT 
             COUNT(DISTINCT hv.id_pasajero) AS Pasajeros_Unicos,
@@ -276,55 +436,103 @@ class VisualizadorDatos:
             ROUND(AVG(hv.ticket_price_usd_est), 2) AS Precio_Promedio
         FROM Hecho_Venta hv
         """
-        df = self.ejecutar_query(query)
-        
+        sketches = self.cargar_sketches()
+        if sketches is not None:
+            df = sketches.resumen_ejecutivo().rename(columns={
+                'Ingresos_Totales_USD': 'Ingresos_USD',
+                'Precio_Promedio_USD': 'Precio_Promedio'
+            })
+            df['Aproximado'] = True
+            for kpi, cota in sketches.cotas_error().items():
+                logger.info(f" {kpi}: {cota}")
+        else:
+            df = self.consultar('resumen_ejecutivo', query)
+        return df
+    
+    def graficar(self, nombre):
+        """Consulta los datos de un gráfico y lo renderiza en el proceso actual."""
+        df = getattr(self, f"datos_{nombre}")()
         if df is not None and not df.empty:
-            fig = plt.figure(figsize=(12, 6))
-            ax = fig.add_subplot(111)
-            ax.axis('off')
-            
-            # Datos
-            metrics = [
-                f"Pasajeros Únicos: {int(df.iloc[0]['Pasajeros_Unicos'])}",
-                f"Total de Ventas: {int(df.iloc[0]['Total_Ventas'])}",
-                f"Ingresos Totales: ${df.iloc[0]['Ingresos_USD']:,.2f}",
-                f"Precio Promedio: ${df.iloc[0]['Precio_Promedio']:,.2f}"
-            ]
-            
-            y_pos = 0.9
-            for i, metric in enumerate(metrics):
-                color = ['#3498db', '#2ecc71', '#e74c3c', '#f39c12'][i]
-                ax.text(0.5, y_pos, metric, fontsize=18, fontweight='bold',
-                       ha='center', bbox=dict(boxstyle='round', facecolor=color, alpha=0.3))
-                y_pos -= 0.2
-            
-            ax.set_title('Resumen Ejecutivo - KPIs Principales', fontsize=16, fontweight='bold', pad=20)
-            plt.tight_layout()
-            plt.savefig('08_resumen_ejecutivo.png', dpi=300, bbox_inches='tight')
-            logger.info(" Gráfico: Resumen ejecutivo")
+            renderizar_grafico(nombre, df, self.dpi, self.formato, self.output_dir)
+            logger.info(f" Gráfico: {GRAFICOS[nombre][2]}")
+    
+    def graficar_distribucion_genero(self):
+        """Gráfico de distribución por género."""
+        self.graficar('distribucion_genero')
     
-    def generar_todos_graficos(self):
-        """Genera todos los gráficos."""
+    def graficar_canales_venta(self):
+        """Gráfico de canales de venta."""
+        self.graficar('canales_venta')
+    
+    def graficar_metodos_pago(self):
+        """Gráfico de métodos de pago."""
+        self.graficar('metodos_pago')
+    
+    def graficar_nacionalidades_top(self):
+        """Gráfico de nacionalidades más frecuentes."""
+        self.graficar('nacionalidades_top')
+    
+    def graficar_rango_edades(self):
+        """Gráfico de distribución por rango de edad."""
+        self.graficar('rango_edades')
+    
+    def graficar_maletas(self):
+        """Gráfico de análisis de maletas."""
+        self.graficar('maletas')
+    
+    def graficar_resumen_ejecutivo(self):
+        """Gráfico resumen con KPIs principales."""
+        self.graficar('resumen_ejecutivo')
+    
+    def generar_todos_graficos(self, procesos=None, reporte=None):
+        """Genera todos los gráficos, renderizándolos en paralelo en procesos separados."""
         logger.info("\n" + "="*60)
         logger.info("GENERANDO VISUALIZACIONES")
         logger.info("="*60 + "\n")
         
-        if self.connection is None:
+        if self.connection is None and self.consultas is None:
             logger.error("No hay conexión a la base de datos")
             return
         
+        procesos = procesos or PROCESOS
+        reporte = reporte or REPORTE
         try:
-            self.graficar_distribucion_genero()
-            self.graficar_canales_venta()
-            self.graficar_metodos_pago()
-            self.graficar_nacionalidades_top()
-            self.graficar_rango_edades()
-            self.graficar_maletas()
-            self.graficar_resumen_ejecutivo()
+            # Las consultas se hacen primero, en este proceso; los workers solo dibujan
+            datos = {}
+            for nombre in GRAFICOS:
+                df = getattr(self, f"datos_{nombre}")()
+                if df is not None and not df.empty:
+                    datos[nombre] = df
+            
+            os.makedirs(self.output_dir, exist_ok=True)
+            rutas = {}
+            workers = min(len(datos), procesos or os.cpu_count() or 1)
+            if workers <= 1:
+                for nombre, df in datos.items():
+                    rutas[nombre] = renderizar_grafico(nombre, df, self.dpi, self.formato, self.output_dir)
+                    logger.info(f" Gráfico: {GRAFICOS[nombre][2]}")
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    futures = {
+                        executor.submit(renderizar_grafico, nombre, df, self.dpi, self.formato, self.output_dir): nombre
+                        for nombre, df in datos.items()
+                    }
+                    for future in as_completed(futures):
+                        nombre = futures[future]
+                        rutas[nombre] = future.result()
+                        logger.info(f" Gráfico: {GRAFICOS[nombre][2]}")
+            
+            if reporte == 'pdf':
+                path = generar_reporte_pdf(datos, os.path.join(self.output_dir, 'reporte.pdf'))
+                logger.info(f" Reporte PDF: {path}")
+            elif reporte == 'html':
+                rutas = {nombre: rutas[nombre] for nombre in GRAFICOS if nombre in rutas}
+                path = generar_reporte_html(rutas, os.path.join(self.output_dir, 'reporte.html'))
+                logger.info(f" Reporte HTML: {path}")
             
             logger.info("\n" + "="*60)
             logger.info(" VISUALIZACIONES GENERADAS EXITOSAMENTE")
-            logger.info("Archivos PNG guardados en el directorio actual")
+            logger.info(f"Archivos {self.formato.upper()} guardados en: {self.output_dir}")
             logger.info("="*60 + "\n")
         except Exception as e:
             logger.error(f"Error generando gráficos: {e}")